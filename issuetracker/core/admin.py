@@ -1,15 +1,233 @@
 """Admin views for `core` app."""
+import json
+
+from django import forms
 from django.db.models import Min, Max, Avg, F
-from django.contrib import admin
+from django.db.models.constants import LOOKUP_SEP
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    Http404, HttpResponseBadRequest, HttpResponseNotAllowed,
+    HttpResponseRedirect, JsonResponse, StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 
-from .models import Issue, IssueStatus, IssueCategory
+from . import feed, metrics
+from .middleware import get_current_project, select_project
+from .models import (
+    Project, Issue, IssueStatus, IssueCategory, IssueUpdate, IssueCounter,
+    IssueVersionConflict, IssueAgingReport, IssueAgingEntry, IssueAgingCount)
 from .utils import round_timedelta_to_minute
 
 
-class IssueAdmin(admin.ModelAdmin):
+class ProjectDataAdminForm(forms.ModelForm):
+    """Form for a model owned by a project, that doesn't show the project.
+
+    A new instance is added to the current (or the default) project.
+    """
+
+    def validate_unique(self):
+        """Validate uniqueness of the instance, also within the project.
+
+        Unique constraints that include the project are not validated
+        by default, as the project is not a field of the form.
+        """
+        if self.instance.project_id is None:
+            self.instance.project = \
+                get_current_project() or Project.get_default()
+        try:
+            self.instance.validate_unique(
+                exclude=set(self._get_validation_exclusions()) - {'project'})
+        except forms.ValidationError as e:
+            self._update_errors(e)
+
+
+class IssueAdminForm(ProjectDataAdminForm):
+    """Form for `Issue` that carries the version it was rendered with."""
+
+    class Meta:
+        """Meta attributes of `IssueAdminForm`."""
+
+        model = Issue
+        fields = '__all__'
+        widgets = {'version': forms.HiddenInput}
+
+    def clean(self):
+        """Validate the issue wasn't modified since the form was shown.
+
+        A modification that happens after the validation is detected by
+        `Issue.save`, as the submitted version is set to the instance.
+        """
+        cleaned_data = super().clean()
+        version = cleaned_data.get('version')
+        if self.instance.pk and version is not None \
+                and version != self.instance.version:
+            raise forms.ValidationError(
+                "This issue was modified by someone else since you opened"
+                " it. Reload the page to see the changes and apply yours"
+                " again.", code='version_conflict')
+        return cleaned_data
+
+
+class IssueCounterListFilter(admin.RelatedFieldListFilter):
+    """Filter by a related object, showing number of issues of each.
+
+    Numbers are taken from `IssueCounter`s.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        """Return choices of the filter with issue counts.
+
+        Objects owned by projects, and counts, are limited to the
+        current project.
+        """
+        project = get_current_project()
+        counters = IssueCounter.get_counts(field.name, project=project)
+        if project is not None and any(
+                related_field.name == 'project' for related_field
+                in field.related_model._meta.get_fields()):
+            choices = [
+                (obj.pk, str(obj)) for obj in
+                field.related_model.objects.filter(project=project)]
+        else:
+            choices = super().field_choices(field, request, model_admin)
+        return [
+            (pk, "{} ({})".format(
+                title, counters[pk].total_count if pk in counters else 0))
+            for pk, title in choices]
+
+
+class IssueOpenListFilter(admin.SimpleListFilter):
+    """Filter by whether the issue is open (as counted by counters)."""
+
+    title = "open"
+    parameter_name = 'is_open'
+
+    def lookups(self, request, model_admin):
+        """Return choices of the filter."""
+        return (('1', "Yes"), ('0', "No"))
+
+    def queryset(self, request, queryset):
+        """Return the issues filtered by the chosen value."""
+        if self.value() == '1':
+            return queryset.filter(IssueAgingEntry.OPEN_ISSUES)
+        if self.value() == '0':
+            return queryset.exclude(IssueAgingEntry.OPEN_ISSUES)
+        return queryset
+
+
+class ProjectDataAdminMixin():
+    """Mixin for admin of a model owned by a project.
+
+    Only objects of the current project are shown, and related objects
+    are chosen from those of the current project.
+    """
+
+    form = ProjectDataAdminForm
+    exclude = ('project',)
+
+    def get_queryset(self, request):
+        """Return queryset of objects of the current project."""
+        queryset = super().get_queryset(request)
+        project = get_current_project()
+        return queryset.filter(project=project) if project is not None \
+            else queryset
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Return form field with choices of the current project."""
+        project = get_current_project()
+        if project is not None and 'queryset' not in kwargs and any(
+                field.name == 'project' for field
+                in db_field.related_model._meta.get_fields()):
+            kwargs['queryset'] = db_field.related_model.objects.filter(
+                project=project)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class ProjectedChangeListMixin():
+    """Mixin for `ChangeList` that loads only fields shown in the list.
+
+    The fields are returned by `get_list_display_fields` of the model
+    admin.
+    """
+
+    def get_queryset(self, request):
+        """Return queryset of the list limited to displayed fields."""
+        return super().get_queryset(request).only(
+            *self.model_admin.get_list_display_fields(request))
+
+
+class ProjectAdmin(admin.ModelAdmin):
+    """Admin options for `Project` model."""
+
+    list_display = ('title', 'database')
+
+    def get_readonly_fields(self, request, obj=None):
+        """Return fields that can't be changed.
+
+        `database` can't be changed, as data of the project is not moved.
+        """
+        return ('database',) if obj is not None else ()
+
+    def has_delete_permission(self, request, obj=None):
+        """Return False to disable deletion, as data is not deleted."""
+        return False
+
+    def get_urls(self):
+        """Return URLs of the admin views.
+
+        Include `select_view`.
+        """
+        return [
+            path('<path:object_id>/select/',
+                 self.admin_site.admin_view(self.select_view),
+                 name='core_project_select'),
+        ] + super().get_urls()
+
+    def select_view(self, request, object_id):
+        """Make the project current for the user, and show its issues.
+
+        Any staff user may select any project.
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        select_project(request, get_object_or_404(
+            self.model, pk=object_id))
+        return HttpResponseRedirect(reverse('admin:core_issue_changelist'))
+
+
+class IssueAdmin(ProjectDataAdminMixin, admin.ModelAdmin):
     """Admin options for `Issue` model."""
 
+    form = IssueAdminForm
+    # Seconds to keep `feed_view` stream open (keep-alives are sent more
+    # often than proxy read timeout), after which the client reconnects
+    # (e.g. picking up changes of its session), and milliseconds for the
+    # client to wait before reconnecting.
+    feed_duration = 30 * 60
+    feed_retry = 1000
+    # Maximum number of issues breaching SLA listed in `aging_view`.
+    aging_breaches_shown = 50
     readonly_fields = ('created_at', 'updated_at', 'submitter', 'solver')
+    list_display = ('__str__', 'status', 'category', 'submitter', 'solver',
+                    'created_at', 'solved_at')
+    list_filter = (IssueOpenListFilter,
+                   ('status', IssueCounterListFilter),
+                   ('category', IssueCounterListFilter),
+                   ('solver', IssueCounterListFilter))
+    # Lookups of the fields needed to render `list_display` items, for
+    # those that are not model fields of the same name. Related objects
+    # are selected by the lookups.
+    list_display_fields = {
+        '__str__': ('title',),
+        'status': ('status__title',),
+        'category': ('category__title',),
+        'submitter': ('submitter__username',),
+        'solver': ('solver__username',),
+    }
 
     def get_actions(self, request):
         """Return list of available action.
@@ -24,25 +242,295 @@ class IssueAdmin(admin.ModelAdmin):
         """Return False to disable deletion."""
         return False
 
+    def get_list_display_fields(self, request):
+        """Return lookups of the fields needed to render `list_display`."""
+        return [lookup
+                for name in self.get_list_display(request)
+                for lookup in self.list_display_fields.get(name, (name,))]
+
+    def get_list_select_related(self, request):
+        """Return relations used by `get_list_display_fields`."""
+        return sorted({lookup.rsplit(LOOKUP_SEP, 1)[0]
+                       for lookup in self.get_list_display_fields(request)
+                       if LOOKUP_SEP in lookup})
+
+    def get_changelist(self, request, **kwargs):
+        """Return `ChangeList` class that loads only displayed fields."""
+        changelist = super().get_changelist(request, **kwargs)
+        return type('Projected' + changelist.__name__,
+                    (ProjectedChangeListMixin, changelist), {})
+
+    def get_urls(self):
+        """Return URLs of the admin views.
+
+        Include `similar_view`, `feed_view`, `aging_view`,
+        `analytics_view` and `updates_view`.
+        """
+        return [
+            path('analytics/',
+                 self.admin_site.admin_view(self.analytics_view),
+                 name='core_issue_analytics'),
+            path('aging/', self.admin_site.admin_view(self.aging_view),
+                 name='core_issue_aging'),
+            path('similar/', self.admin_site.admin_view(self.similar_view),
+                 name='core_issue_similar'),
+            path('feed/', self.admin_site.admin_view(self.feed_view),
+                 name='core_issue_feed'),
+            path('<path:object_id>/updates/',
+                 self.admin_site.admin_view(self.updates_view),
+                 name='core_issue_updates'),
+        ] + super().get_urls()
+
+    def similar_view(self, request):
+        """Return JSON list of likely duplicates of an issue being added.
+
+        Texts of the issue are taken from `title` and `description` GET
+        parameters.
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        similar_issues = self.model.find_similar(
+            request.GET.get('title', ''), request.GET.get('description', ''),
+            project=get_current_project())
+        return JsonResponse({'issues': [
+            {'title': str(issue),
+             'url': reverse('admin:core_issue_change', args=[issue.pk]),
+             'similarity': similarity}
+            for issue, similarity in similar_issues]})
+
+    def feed_view(self, request):
+        """Return server-sent events stream of `IssueUpdate`s.
+
+        The stream starts after `IssueUpdate` with primary key from
+        `Last-Event-ID` header (sent by `EventSource` on reconnection)
+        or `after` GET parameter, or after the latest one. It is closed
+        after `feed_duration` seconds, for the client to reconnect.
+
+        An update committed after more than `core.feed.REFEED_WINDOW`
+        greater primary keys were allocated (e.g. by a long transaction)
+        is silently not sent.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        project = get_current_project()
+        project_id = project.pk if project is not None else None
+        after_id = request.META.get('HTTP_LAST_EVENT_ID',
+                                    request.GET.get('after'))
+        try:
+            after_id = int(after_id) if after_id \
+                else feed.get_last_id(project_id)
+        except ValueError:
+            return HttpResponseBadRequest()
+        response = StreamingHttpResponse(
+            self._get_feed_events(after_id, project_id),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Disable buffering by nginx.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _get_feed_events(self, after_id, project_id):
+        """Yield server-sent events of `IssueUpdate`s after the given.
+
+        Only updates of the project are sent, if it's not None. Event
+        ID is the greatest primary key fed, as an update committed late
+        may follow greater ones.
+        """
+        yield 'retry: {}\n\n'.format(self.feed_retry)
+        last_id = after_id
+        for updates in feed.iter_updates(after_id, self.feed_duration,
+                                         project_id):
+            if updates is None:
+                yield ': keep-alive\n\n'
+                continue
+            for update in updates:
+                last_id = max(last_id, update['pk'])
+                yield 'id: {}\nevent: issue_update\ndata: {}\n\n'.format(
+                    last_id, json.dumps({
+                        'issue': update['issue_id'],
+                        'title': update['title'],
+                        'updated_at': update['updated_at'],
+                        'url': reverse('admin:core_issue_change',
+                                       args=[update['issue_id']]),
+                    }, cls=DjangoJSONEncoder))
+
+    def aging_view(self, request):
+        """Return page of the issue aging report.
+
+        Show numbers of open issues of the current project per category,
+        status and age bucket, and the oldest issues that breach SLA, as
+        of the last refresh of `IssueAgingReport`.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        project = get_current_project()
+        project_id = project.pk if project is not None else None
+        rows, totals, breached_total = IssueAgingCount.get_table(project_id)
+        breaches = IssueAgingEntry.objects.filter(breaches_sla=True)
+        if project_id is not None:
+            breaches = breaches.filter(project=project_id)
+        return TemplateResponse(
+            request, 'admin/core/issue/aging.html',
+            dict(self.admin_site.each_context(request),
+                 title="Issue aging report",
+                 opts=self.model._meta,
+                 report=IssueAgingReport.get(),
+                 bucket_titles=IssueAgingEntry.BUCKET_TITLES,
+                 rows=rows, totals=totals, breached_total=breached_total,
+                 breaches=breaches.select_related('issue')
+                 .only('created_at', 'issue__title')
+                 .order_by('created_at')[:self.aging_breaches_shown]))
+
+    def analytics_view(self, request):
+        """Return page of solution time analytics.
+
+        Reports are computed over `core.analytics.Snapshot` of DB of the
+        current project, over issues of the project, optionally only of
+        the category and status from `category` and `status` GET
+        parameters.
+        """
+        # Imported here, as NumPy is slow to import.
+        from . import analytics
+
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        try:
+            filters = {'{}_id'.format(name): int(request.GET[name])
+                       for name in ('category', 'status')
+                       if request.GET.get(name)}
+        except ValueError:
+            return HttpResponseBadRequest()
+        categories = IssueCategory.objects.order_by('title')
+        statuses = IssueStatus.objects.order_by('title')
+        project = get_current_project()
+        if project is not None:
+            categories = categories.filter(project=project)
+            statuses = statuses.filter(project=project)
+        context = dict(
+            self.admin_site.each_context(request),
+            title="Solution time analytics",
+            opts=self.model._meta,
+            categories=categories,
+            statuses=statuses,
+            filters=filters)
+        snapshot = analytics.Snapshot.load()
+        if snapshot is not None:
+            if project is not None:
+                filters = dict(filters, project_id=project.pk)
+            throughput = snapshot.get_solver_throughput(**filters)
+            solvers = User.objects.in_bulk(
+                [solver_id for solver_id, *_ in throughput if solver_id])
+            context.update(
+                snapshot=snapshot,
+                histogram=snapshot.get_histogram(**filters),
+                trend=snapshot.get_trend(**filters),
+                throughput=[(solvers.get(solver_id), *stats)
+                            for solver_id, *stats in throughput],
+                cohorts=snapshot.get_cohorts(**filters),
+                cohort_solved_within=analytics.COHORT_SOLVED_WITHIN)
+        return TemplateResponse(request, 'admin/core/issue/analytics.html',
+                                context)
+
+    def updates_view(self, request, object_id):
+        """Return HTML fragment with a page of the issue history.
+
+        The page starts with the update preceding (in time order)
+        `IssueUpdate` with primary key from `before` GET parameter, if it
+        is passed. Only history of issues of the current project is
+        shown.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        try:
+            issue_id = int(object_id)
+            before = int(request.GET['before']) \
+                if 'before' in request.GET else None
+        except ValueError:
+            return HttpResponseBadRequest()
+        if not self.get_queryset(request).filter(pk=issue_id).exists():
+            raise Http404
+        page, next_before = IssueUpdate.get_history_page(issue_id, before)
+        return TemplateResponse(
+            request, 'admin/core/issue/updates.html',
+            {'page': page,
+             'next_url': '{}?before={}'.format(
+                 request.path, next_before) if next_before else None})
+
+    def add_view(self, request, form_url='', extra_context=None):
+        """Return add page view.
+
+        Add URL of `similar_view` to the context.
+        """
+        extra_context = extra_context or {}
+        extra_context['similar_issues_url'] = reverse(
+            'admin:core_issue_similar')
+        return super().add_view(request, form_url, extra_context)
+
+    def change_view(self, request, object_id, form_url='',
+                    extra_context=None):
+        """Return change page view.
+
+        Add URL of `updates_view` to the context.
+        """
+        extra_context = extra_context or {}
+        extra_context['issue_updates_url'] = reverse(
+            'admin:core_issue_updates', args=[object_id])
+        return super().change_view(request, object_id, form_url,
+                                   extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='',
+                        extra_context=None):
+        """Return add/change page view.
+
+        Report `IssueVersionConflict` raised after the form validation
+        (the issue was modified concurrently) as an error message.
+        """
+        try:
+            return super().changeform_view(request, object_id, form_url,
+                                           extra_context)
+        except IssueVersionConflict:
+            self.message_user(
+                request, "This issue was modified by someone else while"
+                " your changes were being saved. Your changes were not"
+                " saved.", messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
     def changelist_view(self, request, extra_context=None):
         """Return model instances change list/actions page view.
 
         Add stats variables to the context.
         """
         extra_context = extra_context or {}
-        stats = self.model.objects.filter(solved_at__isnull=False).aggregate(
-            min_solution_time=Min(F('solved_at') - F('created_at')),
-            max_solution_time=Max(F('solved_at') - F('created_at')),
-            avg_solution_time=Avg(F('solved_at') - F('created_at')))
+        with metrics.STATS_QUERY_DURATION.time():
+            stats = self.get_queryset(request).filter(
+                solved_at__isnull=False).aggregate(
+                    min_solution_time=Min(F('solved_at') - F('created_at')),
+                    max_solution_time=Max(F('solved_at') - F('created_at')),
+                    avg_solution_time=Avg(F('solved_at') - F('created_at')))
         extra_context['min_solution_time'] = round_timedelta_to_minute(
             stats['min_solution_time'])
         extra_context['max_solution_time'] = round_timedelta_to_minute(
             stats['max_solution_time'])
         extra_context['avg_solution_time'] = round_timedelta_to_minute(
             stats['avg_solution_time'])
+        # Start the feed from the page state, in case the stream is
+        # reconnected before any event is received.
+        project = get_current_project()
+        extra_context['issue_feed_url'] = '{}?after={}'.format(
+            reverse('admin:core_issue_feed'),
+            feed.get_last_id(project.pk if project is not None else None))
         return super().changelist_view(request, extra_context=extra_context)
 
 
+class IssueStatusAdmin(ProjectDataAdminMixin, admin.ModelAdmin):
+    """Admin options for `IssueStatus` model."""
+
+
+class IssueCategoryAdmin(ProjectDataAdminMixin, admin.ModelAdmin):
+    """Admin options for `IssueCategory` model."""
+
+
+admin.site.register(Project, ProjectAdmin)
 admin.site.register(Issue, IssueAdmin)
-admin.site.register(IssueStatus)
-admin.site.register(IssueCategory)
+admin.site.register(IssueStatus, IssueStatusAdmin)
+admin.site.register(IssueCategory, IssueCategoryAdmin)
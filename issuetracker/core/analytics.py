@@ -0,0 +1,412 @@
+"""Analytics of issue solution times over a columnar snapshot of issues.
+
+Columns of all issues needed by the reports are kept in
+`ISSUE_ANALYTICS_DIR` as NumPy files, which are memory-mapped when a
+`Snapshot` is loaded, so reports over millions of issues are computed
+with vectorized operations without loading `Issue` objects. The
+snapshot is refreshed incrementally by `refresh` (run on schedule by
+`refresh_issue_analytics` command) from issues with `updated_at` after
+the latest one already in the snapshot. A snapshot covers all projects
+of a DB, and is kept in a subdirectory named after the DB alias; reports
+are computed over issues of a project.
+
+Timestamps are stored as seconds since the epoch (UTC), missing values
+(of `solved_at` and foreign keys) as -1.
+
+The snapshot is rebuilt from all issues each `REBUILD_INTERVAL`, and on
+a refresh that finds its number of rows different from the number of
+issues in the DB (e.g. after issues were deleted, or created by a
+transaction committed more than `REFRESH_OVERLAP` after their
+`updated_at`). Until a rebuild, the snapshot misses changes of issues
+that don't update `updated_at` (e.g. `status` set to NULL on deletion
+of the status), and changes committed more than `REFRESH_OVERLAP`
+after their `updated_at`.
+
+The module imports NumPy, so it is imported only where it is used.
+"""
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models
+
+from .middleware import get_current_project
+from .models import Issue
+
+
+# Names of the columns, with `Issue` fields they are loaded from.
+COLUMNS = (
+    ('id', 'pk'),
+    ('project_id', 'project'),
+    ('created_at', 'created_at'),
+    ('solved_at', 'solved_at'),
+    ('status_id', 'status'),
+    ('category_id', 'category'),
+    ('solver_id', 'solver'),
+)
+TIMESTAMP_COLUMNS = ('created_at', 'solved_at')
+# Number of issues fetched from DB and converted at once.
+CHUNK_SIZE = 100000
+# Issues updated up to this long before the latest `updated_at` in the
+# snapshot are fetched again on refresh, in case they were committed
+# after the previous refresh.
+REFRESH_OVERLAP = timedelta(minutes=5)
+# Maximum age of a snapshot built from all issues, after which a refresh
+# rebuilds it.
+REBUILD_INTERVAL = timedelta(days=1)
+# Number of times `Snapshot.load` reads the current snapshot, in case
+# it is replaced and deleted by a concurrent refresh meanwhile.
+LOAD_ATTEMPTS = 3
+# Upper edges of `Snapshot.get_histogram` bins, in hours.
+HISTOGRAM_EDGES = (1, 4, 24, 3 * 24, 7 * 24, 30 * 24)
+# Periods of `Snapshot.get_cohorts` to count issues solved within, in
+# days.
+COHORT_SOLVED_WITHIN = (1, 7, 30)
+
+_DAY = 24 * 60 * 60
+_CURRENT = 'current.json'
+
+
+def _to_timestamp(value: (Union[datetime, None], "Value of the field")
+                  ) -> int:
+    """Return seconds since the epoch, or -1 for None."""
+    return int(value.timestamp()) if value is not None else -1
+
+
+def _to_datetime(timestamp: (int, "Seconds since the epoch")) -> datetime:
+    """Return aware datetime of the timestamp."""
+    return datetime.fromtimestamp(int(timestamp), timezone.utc)
+
+
+def _get_directory(
+        directory: (Union[str, None], "Directory of the snapshot")) -> str:
+    """Return the directory, or that of DB of the current project if None.
+
+    The latter is the subdirectory of `ISSUE_ANALYTICS_DIR` named after
+    the DB alias.
+    """
+    if directory is not None:
+        return directory
+    project = get_current_project()
+    return os.path.join(settings.ISSUE_ANALYTICS_DIR,
+                        project.database if project is not None
+                        else DEFAULT_DB_ALIAS)
+
+
+def _fetch_columns(
+        issues: (models.QuerySet, "Issues to fetch")
+        ) -> Dict[str, np.ndarray]:
+    """Return columns of the issues, ordered by primary key.
+
+    Issues are streamed from DB in chunks of `CHUNK_SIZE` and converted
+    into arrays chunk by chunk, so that only arrays are kept in memory.
+    """
+    rows = issues.order_by('pk').values_list(
+        *[field_name for _, field_name in COLUMNS]).iterator(
+            chunk_size=CHUNK_SIZE)
+    chunks = {name: [] for name, _ in COLUMNS}
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        for (name, _), values in zip(COLUMNS, zip(*chunk)):
+            if name in TIMESTAMP_COLUMNS:
+                values = map(_to_timestamp, values)
+            else:
+                values = (-1 if value is None else value
+                          for value in values)
+            chunks[name].append(
+                np.fromiter(values, np.int64, count=len(chunk)))
+    return {name: np.concatenate(arrays) if arrays
+            else np.empty(0, np.int64)
+            for name, arrays in chunks.items()}
+
+
+def _get_max_updated_at(
+        issues: (models.QuerySet, "Fetched issues")
+        ) -> Union[datetime, None]:
+    """Return the latest `updated_at` of the issues."""
+    return issues.order_by('-updated_at').values_list(
+        'updated_at', flat=True).first()
+
+
+class Snapshot():
+    """Memory-mapped columns of issues of a DB, see the module docstring."""
+
+    def __init__(self,
+                 directory: (str, "Directory of the snapshot files"),
+                 columns: (Dict[str, np.ndarray], "Arrays of the columns"),
+                 updated_at: (Union[datetime, None],
+                              "The latest `updated_at` of the issues"),
+                 built_at: (Union[datetime, None],
+                            "When it was last built from all issues")):
+        """Initialize the instance."""
+        self.directory = directory
+        self.columns = columns
+        self.updated_at = updated_at
+        self.built_at = built_at
+
+    @classmethod
+    def load(cls,
+             directory: (Union[str, None],
+                         "Directory of the snapshot, that of DB of the"
+                         " current project if None") = None
+             ) -> Union["Snapshot", None]:
+        """Return the current snapshot, or None if it wasn't built."""
+        directory = _get_directory(directory)
+        for attempt in range(LOAD_ATTEMPTS):
+            try:
+                with open(os.path.join(directory, _CURRENT)) as file:
+                    current = json.load(file)
+            except FileNotFoundError:
+                return None
+            try:
+                columns = {
+                    name: np.load(os.path.join(
+                        directory, current['version'], name + '.npy'),
+                        mmap_mode='r')
+                    for name, _ in COLUMNS}
+            except FileNotFoundError:
+                # Replaced by a refresh after `_CURRENT` was read.
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+            else:
+                return cls(directory, columns, *(
+                    _to_datetime(current[name])
+                    if current.get(name) is not None else None
+                    for name in ('updated_at', 'built_at')))
+
+    @classmethod
+    def refresh(cls,
+                directory: (Union[str, None],
+                            "Directory of the snapshot, that of DB of the"
+                            " current project if None") = None,
+                rebuild: (bool, "Fetch all issues, even if a snapshot"
+                          " exists") = False) -> Tuple["Snapshot", int]:
+        """Refresh the snapshot, return it and number of fetched issues.
+
+        Issues updated since the latest `updated_at` in the current
+        snapshot (minus `REFRESH_OVERLAP`) replace their rows in it, or
+        are inserted. The snapshot is rebuilt instead if it's older
+        than `REBUILD_INTERVAL`, or if the result doesn't have a row per
+        issue. The new snapshot is written next to the current one, and
+        replaces it atomically, so that readers are not affected.
+        Issues are fetched from DB of the current project.
+        """
+        directory = _get_directory(directory)
+        os.makedirs(directory, exist_ok=True)
+        now = datetime.now(timezone.utc)
+        current = None if rebuild else cls.load(directory)
+        if current is not None and (
+                current.built_at is None or
+                now - current.built_at >= REBUILD_INTERVAL):
+            current = None
+        issues = Issue.objects.all()
+        if current is not None and current.updated_at is not None:
+            issues = issues.filter(
+                updated_at__gte=current.updated_at - REFRESH_OVERLAP)
+        # Taken before fetching, so that issues updated meanwhile are
+        # fetched again by the next refresh.
+        updated_at = _get_max_updated_at(issues)
+        fetched = _fetch_columns(issues)
+        fetched_count = len(fetched['id'])
+        built_at = now
+        if current is not None:
+            updated_at = updated_at or current.updated_at
+            built_at = current.built_at
+            fetched = _merge(current.columns, fetched)
+            # Rows are ordered by `id`.
+            if len(fetched['id']) and Issue.objects.filter(
+                    pk__lte=fetched['id'][-1]).count() != \
+                    len(fetched['id']):
+                return cls.refresh(directory, rebuild=True)
+
+        version = 'snapshot-{}'.format(uuid.uuid4().hex)
+        os.mkdir(os.path.join(directory, version))
+        for name, array in fetched.items():
+            np.save(os.path.join(directory, version, name + '.npy'), array)
+        temporary_path = os.path.join(directory, _CURRENT + '.tmp')
+        with open(temporary_path, 'w') as file:
+            json.dump({'version': version,
+                       'updated_at': updated_at.timestamp()
+                       if updated_at is not None else None,
+                       'built_at': built_at.timestamp()}, file)
+        os.replace(temporary_path, os.path.join(directory, _CURRENT))
+        # Snapshots mapped by readers stay readable until unmapped.
+        for name in os.listdir(directory):
+            if name.startswith('snapshot-') and name != version:
+                shutil.rmtree(os.path.join(directory, name),
+                              ignore_errors=True)
+        return cls.load(directory), fetched_count
+
+    def _select(self, category_id, status_id, project_id):
+        """Return mask of rows of the category, status and project."""
+        mask = np.ones(len(self.columns['id']), bool)
+        if project_id is not None:
+            mask &= self.columns['project_id'] == project_id
+        if category_id is not None:
+            mask &= self.columns['category_id'] == category_id
+        if status_id is not None:
+            mask &= self.columns['status_id'] == status_id
+        return mask
+
+    def _get_solved(self, category_id, status_id, project_id):
+        """Return mask of solved rows and their solution times in hours."""
+        solved = self._select(category_id, status_id, project_id) & \
+            (self.columns['solved_at'] >= 0)
+        return solved, (self.columns['solved_at'][solved] -
+                        self.columns['created_at'][solved]) / 3600
+
+    def get_count(self,
+                  project_id: (Union[int, None], "Only of the project") = None
+                  ) -> int:
+        """Return number of issues in the snapshot."""
+        if project_id is not None:
+            return int(np.count_nonzero(
+                self.columns['project_id'] == project_id))
+        return len(self.columns['id'])
+
+    def get_histogram(
+            self,
+            category_id: (Union[int, None], "Only of the category") = None,
+            status_id: (Union[int, None], "Only of the status") = None,
+            project_id: (Union[int, None], "Only of the project") = None
+            ) -> List[Tuple[float, Union[float, None], int]]:
+        """Return histogram of solution times of solved issues.
+
+        Return list of (from, to, count) tuples, where `from` and `to`
+        are hours per `HISTOGRAM_EDGES` (`to` is None for the last bin).
+        """
+        _, hours = self._get_solved(category_id, status_id, project_id)
+        edges = (0,) + HISTOGRAM_EDGES
+        counts = np.bincount(
+            np.searchsorted(HISTOGRAM_EDGES, hours, side='right'),
+            minlength=len(edges))
+        return [(from_, to, int(count)) for from_, to, count
+                in zip(edges, HISTOGRAM_EDGES + (None,), counts)]
+
+    @staticmethod
+    def _get_group_stats(groups, hours):
+        """Return unique groups with count, mean and median of hours.
+
+        Rows are ordered by group with a stable sort of small integer
+        codes (radix sort), and median of each group is found in linear
+        time, as sorting all the hours is much slower.
+        """
+        unique, codes = np.unique(groups, return_inverse=True)
+        if not len(unique):
+            return unique, np.empty(0, int), np.empty(0), np.empty(0)
+        counts = np.bincount(codes, minlength=len(unique))
+        means = np.bincount(codes, hours, len(unique)) / counts
+        if len(unique) <= np.iinfo(np.uint16).max:
+            codes = codes.astype(np.uint16)
+        hours = hours[np.argsort(codes, kind='stable')]
+        medians = np.array([np.median(part) for part in
+                            np.split(hours, np.cumsum(counts)[:-1])])
+        return unique, counts, means, medians
+
+    def get_trend(
+            self,
+            days: (int, "Length of a period") = 7,
+            category_id: (Union[int, None], "Only of the category") = None,
+            status_id: (Union[int, None], "Only of the status") = None,
+            project_id: (Union[int, None], "Only of the project") = None
+            ) -> List[Tuple[datetime, int, float, float]]:
+        """Return solution times of issues by period they were solved in.
+
+        Return list of (period start, count, mean hours, median hours)
+        tuples of periods with solved issues, oldest first. Periods
+        start on Mondays (if `days` is a multiple of 7) at 00:00 UTC.
+        """
+        solved, hours = self._get_solved(category_id, status_id, project_id)
+        # The epoch was on Thursday.
+        offset = 3 * _DAY if days % 7 == 0 else 0
+        periods = (self.columns['solved_at'][solved] + offset) // \
+            (days * _DAY)
+        return [(_to_datetime(period * days * _DAY - offset), int(count),
+                 float(mean), float(median))
+                for period, count, mean, median
+                in zip(*self._get_group_stats(periods, hours))]
+
+    def get_solver_throughput(
+            self,
+            category_id: (Union[int, None], "Only of the category") = None,
+            status_id: (Union[int, None], "Only of the status") = None,
+            project_id: (Union[int, None], "Only of the project") = None
+            ) -> List[Tuple[Union[int, None], int, float, float]]:
+        """Return numbers and solution times of issues per solver.
+
+        Return list of (solver primary key, count, mean hours, median
+        hours) tuples, by count descending. The primary key is None for
+        issues solved without a solver.
+        """
+        solved, hours = self._get_solved(category_id, status_id, project_id)
+        stats = sorted(
+            zip(*self._get_group_stats(self.columns['solver_id'][solved],
+                                       hours)),
+            key=lambda row: -row[1])
+        return [(int(solver_id) if solver_id >= 0 else None, int(count),
+                 float(mean), float(median))
+                for solver_id, count, mean, median in stats]
+
+    def get_cohorts(
+            self,
+            days: (int, "Length of a period") = 7,
+            category_id: (Union[int, None], "Only of the category") = None,
+            status_id: (Union[int, None], "Only of the status") = None,
+            project_id: (Union[int, None], "Only of the project") = None
+            ) -> List[Tuple[datetime, int, List[int]]]:
+        """Return numbers of issues solved in time by creation period.
+
+        Return list of (period start, number of created issues, numbers
+        of them solved within each of `COHORT_SOLVED_WITHIN` days)
+        tuples of periods with created issues, oldest first. Periods
+        are aligned as in `get_trend`.
+        """
+        selected = self._select(category_id, status_id, project_id)
+        created_at = self.columns['created_at'][selected]
+        solved_at = self.columns['solved_at'][selected]
+        offset = 3 * _DAY if days % 7 == 0 else 0
+        periods, cohorts = np.unique((created_at + offset) // (days * _DAY),
+                                     return_inverse=True)
+        solved_within = [
+            np.bincount(cohorts, (solved_at >= 0) &
+                        (solved_at - created_at <= within * _DAY),
+                        minlength=len(periods)).astype(int)
+            for within in COHORT_SOLVED_WITHIN]
+        return [(_to_datetime(period * days * _DAY - offset), int(count),
+                 [int(solved[index]) for solved in solved_within])
+                for index, (period, count) in enumerate(zip(
+                    periods, np.bincount(cohorts, minlength=len(periods))))]
+
+
+def _merge(old: (Dict[str, np.ndarray], "Columns of the current snapshot"),
+           new: (Dict[str, np.ndarray], "Columns of fetched issues")
+           ) -> Dict[str, np.ndarray]:
+    """Return columns of the snapshot with rows of fetched issues.
+
+    Rows of issues already in the snapshot are replaced, others are
+    inserted keeping the rows ordered by `id`.
+    """
+    positions = np.searchsorted(old['id'], new['id'])
+    existing = positions < len(old['id'])
+    existing[existing] = old['id'][positions[existing]] == \
+        new['id'][existing]
+    inserted = ~existing
+    order = None
+    if inserted.any() and len(old['id']) and \
+            new['id'][inserted].min() < old['id'][-1]:
+        order = np.argsort(np.concatenate(
+            [old['id'], new['id'][inserted]]), kind='mergesort')
+    merged = {}
+    for name, _ in COLUMNS:
+        column = np.concatenate([old[name], new[name][inserted]])
+        column[positions[existing]] = new[name][existing]
+        merged[name] = column[order] if order is not None else column
+    return merged
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """Connect signal receivers of `core.feed` and `core.permissions`.
+
+        Receivers of `core.metrics` are connected by the middleware.
+        """
+        from . import feed, permissions  # noqa: F401
@@ -0,0 +1,322 @@
+"""Push-based feed of `IssueUpdate`s.
+
+Creation of an `IssueUpdate` is announced with PostgreSQL `NOTIFY`
+(delivered on commit), which a single listener thread per process
+receives on its own connection with `LISTEN`. On each notification, new
+updates are fetched from the DB once per process, by one of the waiting
+subscribers, into an in-memory buffer shared by all subscribers of the
+process. Subscribers read the buffer, so an idle subscriber holds no DB
+connection, and the DB load doesn't grow with the number of
+subscribers. A subscriber only queries the DB when it starts, or if it
+falls behind the buffer by more than `BUFFER_SIZE` updates.
+
+On other DBs (or while the listener is reconnecting), notifications are
+only received of commits of the same process, so new updates are also
+fetched into the buffer each `WAIT_TIMEOUT` seconds.
+
+Transactions may commit `IssueUpdate`s out of primary key order, so
+each query also covers `REFEED_WINDOW` primary keys below the greatest
+one fed, and updates fed already are skipped. An update committed
+after `REFEED_WINDOW` greater ones were fed is missed.
+
+Only updates of projects stored in the default DB are fed (see
+`core.routers.ProjectRouter`).
+"""
+import logging
+import select
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import IssueUpdate
+
+
+CHANNEL = 'core_issue_updates'
+# Seconds to wait for updates before yielding a keep-alive, and, while
+# notifications are not received, before checking the DB again.
+WAIT_TIMEOUT = 10
+# Seconds to wait before reconnecting after the listener connection
+# failed.
+RECONNECT_DELAY = 5
+# Maximum number of `IssueUpdate`s returned by a single query.
+BATCH_SIZE = 100
+# Number of primary keys below the greatest one fed that are queried
+# again for updates committed late.
+REFEED_WINDOW = 100
+# Number of the latest fetched updates kept in the buffer.
+BUFFER_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_condition = threading.Condition()
+# The latest updates fetched by this process, shared by its subscribers,
+# and the number of updates ever added to it.
+_buffer = deque(maxlen=BUFFER_SIZE)
+_buffered_count = 0
+# Numbers of notifications of new `IssueUpdate`s this process received,
+# and of those covered by the last fetch, and when it was made.
+_notification_count = 0
+_fetched_count = 0
+_fetched_at = None
+# Whether the listener receives notifications of all processes.
+_listening = False
+# Held while updates are fetched into the buffer. Primary keys of the
+# greatest update fetched, and of those fetched within `REFEED_WINDOW`
+# below it, are only used with the lock held.
+_fetch_lock = threading.Lock()
+_last_fetched_id = None
+_fetched_ids = set()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _wake():
+    """Wake up subscribers waiting for updates."""
+    global _notification_count
+    with _condition:
+        _notification_count += 1
+        _condition.notify_all()
+
+
+def _set_listening(listening):
+    """Set whether the listener receives notifications."""
+    global _listening
+    with _condition:
+        _listening = listening
+
+
+def _listen():
+    """Receive notifications from PostgreSQL and wake up subscribers.
+
+    Run forever in a daemon thread, reconnecting on errors.
+    """
+    while True:
+        try:
+            db_connection = connection.get_new_connection(
+                connection.get_connection_params())
+            db_connection.autocommit = True
+            with db_connection.cursor() as cursor:
+                cursor.execute('LISTEN {}'.format(CHANNEL))
+            _set_listening(True)
+            # Updates may have been created while not listening.
+            _wake()
+            while True:
+                if select.select([db_connection], [], [], WAIT_TIMEOUT)[0]:
+                    db_connection.poll()
+                    if db_connection.notifies:
+                        _wake()
+                        db_connection.notifies.clear()
+        except Exception:
+            _set_listening(False)
+            logger.exception("Issue updates listener failed, reconnecting.")
+            time.sleep(RECONNECT_DELAY)
+
+
+def _ensure_listener():
+    """Start the listener thread of this process, if needed."""
+    global _listener
+    if connection.vendor != 'postgresql' or _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(
+                target=_listen, name='issue-updates-listener', daemon=True)
+            _listener.start()
+
+
+@receiver(post_save, sender=IssueUpdate)
+def _notify(sender, instance, created, using, **kwargs):
+    """Announce a created `IssueUpdate` to subscribers."""
+    if not created or using != DEFAULT_DB_ALIAS:
+        return
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)',
+                           [CHANNEL, str(instance.pk)])
+    else:
+        transaction.on_commit(_wake)
+
+
+def _get_queryset(project_id):
+    """Return queryset of `IssueUpdate`s of the project, if not None."""
+    updates = IssueUpdate.objects.using(DEFAULT_DB_ALIAS)
+    return updates.filter(project=project_id) if project_id is not None \
+        else updates
+
+
+def get_last_id(
+        project_id: (Union[int, None], "Only of the project") = None
+        ) -> int:
+    """Return primary key of the latest `IssueUpdate`, or 0."""
+    return _get_queryset(project_id).order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+
+
+def get_updates(after_id: (int, "Return updates with greater primary key"),
+                exclude_ids: (Iterable[int], "Primary keys of updates to"
+                              " skip") = (),
+                project_id: (Union[int, None], "Only of the project") = None
+                ) -> List[Dict]:
+    """Return next batch of `IssueUpdate`s as dicts, oldest first."""
+    return list(_get_queryset(project_id)
+                .filter(pk__gt=after_id).exclude(pk__in=exclude_ids)
+                .order_by('pk')
+                .values('pk', 'issue_id', 'project_id', 'title',
+                        'updated_at')[:BATCH_SIZE])
+
+
+def _start_fetching():
+    """Take updates that exist now as fetched, if nothing was fetched."""
+    global _last_fetched_id, _fetched_ids
+    with _fetch_lock:
+        if _last_fetched_id is None:
+            _last_fetched_id = get_last_id()
+            _fetched_ids = set(
+                _get_queryset(None).filter(
+                    pk__gt=_last_fetched_id - REFEED_WINDOW).values_list(
+                        'pk', flat=True))
+            connection.close()
+
+
+def _fetch():
+    """Fetch new updates of the DB into the buffer.
+
+    Must be called with `_fetch_lock` held. Subscribers are woken after
+    each batch. The DB connection is closed afterwards.
+    """
+    global _buffered_count, _fetched_count, _fetched_at
+    global _last_fetched_id, _fetched_ids
+    with _condition:
+        notification_count = _notification_count
+    try:
+        while True:
+            updates = get_updates(_last_fetched_id - REFEED_WINDOW,
+                                  _fetched_ids)
+            if updates:
+                _last_fetched_id = max(_last_fetched_id, updates[-1]['pk'])
+                _fetched_ids.update(update['pk'] for update in updates)
+                _fetched_ids = {pk for pk in _fetched_ids
+                                if pk > _last_fetched_id - REFEED_WINDOW}
+            with _condition:
+                _buffer.extend(updates)
+                _buffered_count += len(updates)
+                if len(updates) < BATCH_SIZE:
+                    _fetched_count = notification_count
+                    _fetched_at = time.monotonic()
+                _condition.notify_all()
+            if len(updates) < BATCH_SIZE:
+                return
+    finally:
+        connection.close()
+
+
+def _is_fetch_due() -> bool:
+    """Return True if new updates are to be fetched into the buffer.
+
+    Must be called with `_condition` held.
+    """
+    if _fetched_count != _notification_count:
+        return True
+    return not _listening and (
+        _fetched_at is None or
+        time.monotonic() - _fetched_at >= WAIT_TIMEOUT)
+
+
+def _read_buffer(
+        position: (int, "Number of buffered updates read already"),
+        timeout: (float, "Seconds to wait for updates")
+        ) -> Tuple[int, Union[List[Dict], None]]:
+    """Wait for updates to be added to the buffer, and return them.
+
+    Return the new position and the updates (empty if none were added
+    within the timeout), or None instead of them if some were already
+    dropped from the buffer. If updates need to be fetched (see the
+    module docstring), the first subscriber to notice fetches them.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        with _condition:
+            while _buffered_count == position:
+                if _is_fetch_due() and _fetch_lock.acquire(blocking=False):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return position, []
+                _condition.wait(remaining)
+            else:
+                added = _buffered_count - position
+                if added > len(_buffer):
+                    return _buffered_count, None
+                return _buffered_count, [_buffer[index]
+                                         for index in range(-added, 0)]
+        try:
+            _fetch()
+        finally:
+            _fetch_lock.release()
+
+
+def iter_updates(
+        after_id: (int, "Primary key of the last update seen"),
+        duration: (float, "Seconds to wait for updates in total"),
+        project_id: (Union[int, None], "Only of the project") = None
+        ) -> Iterator[Union[List[Dict], None]]:
+    """Yield batches of new `IssueUpdate`s as they are created.
+
+    Only updates of the project are yielded, if it's not None. Updates
+    within `REFEED_WINDOW` below `after_id` that exist when
+    iteration starts are taken as seen. Updates are queried from the DB
+    when iteration starts (or if the buffer has dropped unread ones),
+    then read from the buffer. Batches are ordered by primary key, but
+    an update committed late may follow greater ones. None is yielded
+    each `WAIT_TIMEOUT` seconds without updates (e.g. to send a
+    keep-alive). The DB connection is closed while waiting.
+    """
+    _ensure_listener()
+    _start_fetching()
+    deadline = time.monotonic() + duration
+    fed_ids = set(_get_queryset(project_id).filter(
+        pk__gt=after_id - REFEED_WINDOW, pk__lte=after_id).values_list(
+            'pk', flat=True))
+    position = None
+    keep_alive_at = time.monotonic() + WAIT_TIMEOUT
+    while True:
+        if position is None:
+            # Updates added to the buffer meanwhile are skipped if fed.
+            with _condition:
+                position = _buffered_count
+            behind = True
+        if behind:
+            updates = get_updates(after_id - REFEED_WINDOW, fed_ids,
+                                  project_id)
+            behind = len(updates) == BATCH_SIZE
+            if not behind:
+                connection.close()
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            position, updates = _read_buffer(
+                position, min(remaining, keep_alive_at - time.monotonic()))
+            if updates is None:
+                position = None
+                continue
+            updates = [update for update in updates
+                       if update['pk'] > after_id - REFEED_WINDOW and
+                       update['pk'] not in fed_ids and
+                       project_id in (None, update['project_id'])]
+        if updates:
+            after_id = max([after_id] + [update['pk'] for update in updates])
+            fed_ids.update(update['pk'] for update in updates)
+            fed_ids = {pk for pk in fed_ids if pk > after_id - REFEED_WINDOW}
+            keep_alive_at = time.monotonic() + WAIT_TIMEOUT
+            yield updates
+            if deadline <= time.monotonic():
+                return
+        elif not behind and keep_alive_at <= time.monotonic():
+            keep_alive_at = time.monotonic() + WAIT_TIMEOUT
+            yield None
@@ -0,0 +1,46 @@
+"""Command `check_issue_counters`."""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.middleware import use_project
+from core.models import IssueCounter, Project
+
+
+class Command(BaseCommand):
+    """Check (and optionally repair) drift of `IssueCounter`s."""
+
+    help = ("Compare issue counters with counts computed from issues,"
+            " and replace them with computed ones if `--repair` is passed.")
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--repair', action='store_true',
+            help="Replace all counters with computed counts.")
+
+    def handle(self, *args, **options):
+        """Execute the command.
+
+        Counters are checked in each DB that stores data of projects.
+        Fail if the counters drifted, unless they were repaired.
+        """
+        drifted_count = 0
+        for project in Project.get_one_per_database():
+            with use_project(project):
+                drift = IssueCounter.get_drift()
+                for (field_name, project_id, value), (stored, expected) \
+                        in sorted(drift.items()):
+                    self.stdout.write(
+                        "`{}` {} of project {}: stored {} total, {} open;"
+                        " expected {} total, {} open".format(
+                            field_name, value, project_id, *stored,
+                            *expected))
+                if drift and options['repair']:
+                    IssueCounter.repair()
+            drifted_count += len(drift)
+        if not drifted_count:
+            self.stdout.write("Issue counters are correct.")
+        elif options['repair']:
+            self.stdout.write("Issue counters were repaired.")
+        else:
+            raise CommandError(
+                "{} issue counters drifted.".format(drifted_count))
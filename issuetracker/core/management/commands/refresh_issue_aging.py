@@ -0,0 +1,30 @@
+"""Command `refresh_issue_aging`."""
+from django.core.management.base import BaseCommand
+
+from core.middleware import use_project
+from core.models import IssueAgingReport, Project
+
+
+class Command(BaseCommand):
+    """Refresh the issue aging report, to be run on schedule."""
+
+    help = ("Refresh ages of issues changed since the last refresh or"
+            " crossed a bucket or SLA boundary in the issue aging report,"
+            " or rebuild it if `--rebuild` is passed.")
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Rebuild the report from all open issues.")
+
+    def handle(self, *args, **options):
+        """Execute the command.
+
+        The report is refreshed in each DB that stores data of projects.
+        """
+        refreshed = 0
+        for project in Project.get_one_per_database():
+            with use_project(project):
+                refreshed += IssueAgingReport.refresh(options['rebuild'])
+        self.stdout.write("{} issues were refreshed.".format(refreshed))
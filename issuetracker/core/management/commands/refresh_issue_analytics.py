@@ -0,0 +1,35 @@
+"""Command `refresh_issue_analytics`."""
+from django.core.management.base import BaseCommand
+
+from core.middleware import use_project
+from core.models import Project
+
+
+class Command(BaseCommand):
+    """Refresh the issue analytics snapshot, to be run on schedule."""
+
+    help = ("Fetch issues updated since the last refresh into the snapshot"
+            " of issues for solution time analytics, or rebuild it if"
+            " `--rebuild` is passed.")
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Rebuild the snapshot from all issues.")
+
+    def handle(self, *args, **options):
+        """Execute the command.
+
+        A snapshot is refreshed for each DB that stores data of projects.
+        """
+        # Imported here, as NumPy is slow to import.
+        from core.analytics import Snapshot
+
+        for project in Project.get_one_per_database():
+            with use_project(project):
+                snapshot, fetched = Snapshot.refresh(
+                    rebuild=options['rebuild'])
+            self.stdout.write(
+                "`{}` DB: {} issues were fetched, {} are in the snapshot."
+                .format(project.database, fetched, snapshot.get_count()))
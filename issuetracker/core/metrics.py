@@ -0,0 +1,60 @@
+"""Prometheus metrics of the project.
+
+When `prometheus_multiproc_dir` environment variable is set (see
+`gunicorn.conf.py`), values are kept in files of that directory and
+exposition aggregates them across all worker processes.
+
+The module is imported by the metrics middleware (see
+`core.middleware`), so that processes which don't serve HTTP don't
+import `prometheus_client` and don't count anything. Models are
+referred to lazily, as the middleware module is imported by
+`core.models`.
+"""
+import os
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+REQUEST_DURATION = Histogram(
+    'issuetracker_request_duration_seconds',
+    "Time to produce a response (a streamed one, until streaming starts).",
+    ['method', 'view'])
+REQUEST_DB_QUERIES = Histogram(
+    'issuetracker_request_db_queries',
+    "Number of DB queries made to produce a response.",
+    ['view'], buckets=(0, 1, 2, 5, 10, 20, 50, 100, float('inf')))
+STATS_QUERY_DURATION = Histogram(
+    'issuetracker_stats_query_duration_seconds',
+    "Time of the issue solution stats query of the issue list.")
+ISSUE_SAVES = Counter(
+    'issuetracker_issue_saves_total', "Number of saved issues.",
+    ['created'])
+ISSUE_UPDATES = Counter(
+    'issuetracker_issue_updates_total', "Number of created IssueUpdates.")
+
+
+@receiver(post_save, sender='core.Issue')
+def _count_issue_save(sender, created, **kwargs):
+    """Count a saved `Issue`."""
+    ISSUE_SAVES.labels(created=str(created).lower()).inc()
+
+
+@receiver(post_save, sender='core.IssueUpdate')
+def _count_issue_update(sender, created, **kwargs):
+    """Count a created `IssueUpdate`."""
+    if created:
+        ISSUE_UPDATES.inc()
+
+
+def generate() -> bytes:
+    """Return metrics of all processes in Prometheus text format."""
+    if 'prometheus_multiproc_dir' in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
@@ -1,5 +1,15 @@
 """Middleware for `core` app."""
+import time
+from contextlib import ExitStack, contextmanager
 from threading import local
+from typing import TYPE_CHECKING, Union
+
+from django.db import DatabaseError, connections
+from django.http import HttpRequest, HttpResponse
+
+if TYPE_CHECKING:
+    # Not imported at runtime, as `core.models` imports this module.
+    from .models import Project
 
 
 _thread_locals = local()
@@ -11,8 +21,140 @@ def get_current_user():
 
 
 def current_user_storage(get_response):
-    """Return middleware that allows to get current user anywhere."""
+    """Return middleware that allows to get current user anywhere.
+
+    The user is reset after the request, so that it's not taken for the
+    current one by code that runs later in the same thread.
+    """
     def middleware(request):
         _thread_locals.user = request.user
+        try:
+            return get_response(request)
+        finally:
+            _thread_locals.user = None
+    return middleware
+
+
+def get_current_project():
+    """Return the current project, if set, otherwise returns None.
+
+    The project scopes admin views, and data of models owned by projects
+    is read from its DB (see `core.routers.ProjectRouter`).
+    """
+    return getattr(_thread_locals, 'project', None)
+
+
+@contextmanager
+def use_project(project: (Union["Project", None],
+                          "Project to make current, if not None")):
+    """Return context manager that makes the project current within it."""
+    previous = get_current_project()
+    if project is not None:
+        _thread_locals.project = project
+    try:
+        yield
+    finally:
+        _thread_locals.project = previous
+
+
+# Session key of primary key of the project selected by the user.
+PROJECT_SESSION_KEY = 'core_project_id'
+
+
+def select_project(request: (HttpRequest, "Request of the user"),
+                   project: ("Project", "Project to select")):
+    """Make the project current in the following requests of the user."""
+    request.session[PROJECT_SESSION_KEY] = project.pk
+
+
+def current_project_storage(get_response):
+    """Return middleware that makes the project selected by user current.
+
+    The project is loaded on each request, so that its changes apply
+    immediately. The default project is selected if the user hasn't
+    selected one, or the selected one no longer exists.
+    """
+    from .models import Project
+
+    def middleware(request):
+        if not request.user.is_authenticated:
+            return get_response(request)
+        project = Project.objects.filter(
+            pk=request.session.get(PROJECT_SESSION_KEY)).first() \
+            if PROJECT_SESSION_KEY in request.session else None
+        if project is None:
+            project = Project.get_default()
+            select_project(request, project)
+        with use_project(project):
+            return get_response(request)
+    return middleware
+
+
+def _is_db_ready() -> bool:
+    """Return True if all DBs answer a query."""
+    try:
+        for connection in connections.all():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+    except DatabaseError:
+        return False
+    return True
+
+
+def service_endpoints(get_response):
+    """Return middleware that answers service requests.
+
+    `/healthz` (the process is up), `/readyz` (DBs are reachable) and
+    `/metrics` (Prometheus metrics) are answered before the rest of the
+    middleware, so that no session, user or template is loaded. Must be
+    the first middleware.
+    """
+    # Imported here, as `prometheus_client` is slow to import, and this
+    # module is imported by `core.models` in any process.
+    from prometheus_client import CONTENT_TYPE_LATEST
+    from . import metrics
+
+    def middleware(request):
+        if request.path == '/healthz':
+            return HttpResponse("OK", content_type='text/plain')
+        if request.path == '/readyz':
+            if _is_db_ready():
+                return HttpResponse("OK", content_type='text/plain')
+            return HttpResponse("DB is not reachable",
+                                content_type='text/plain', status=503)
+        if request.path == '/metrics':
+            return HttpResponse(metrics.generate(),
+                                content_type=CONTENT_TYPE_LATEST)
         return get_response(request)
     return middleware
+
+
+def request_metrics(get_response):
+    """Return middleware that records duration and DB queries of requests.
+
+    Queries to all DBs are counted, as data of projects may be stored
+    in DBs other than the default one. Must follow `service_endpoints`,
+    so that service requests are not recorded.
+    """
+    from . import metrics
+
+    def middleware(request):
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        started_at = time.monotonic()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = get_response(request)
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else '<unresolved>'
+        metrics.REQUEST_DURATION.labels(
+            method=request.method, view=view).observe(
+                time.monotonic() - started_at)
+        metrics.REQUEST_DB_QUERIES.labels(view=view).observe(len(queries))
+        return response
+    return middleware
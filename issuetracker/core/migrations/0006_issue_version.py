@@ -0,0 +1,18 @@
+# Generated by Django 2.0.13 on 2026-10-19 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_create_staff_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on each update, used to detect concurrent modifications.'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.0.13 on 2026-10-19 01:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from core import minhash
+
+
+def fill_issue_similarity_bands(apps, schema_editor):
+    """Create `IssueSimilarityBand`s of all existing issues.
+
+    Has to duplicate `IssueSimilarityBand.update_for_issue`, as custom
+    methods of models are not available in migrations.
+    """
+    Issue = apps.get_model('core', 'Issue')
+    IssueSimilarityBand = apps.get_model('core', 'IssueSimilarityBand')
+
+    bands = []
+    for issue_id, title, description in Issue.objects.values_list(
+            'id', 'title', 'description').iterator():
+        bands.extend(
+            IssueSimilarityBand(issue_id=issue_id, band=band, hash=hash_)
+            for band, hash_ in enumerate(minhash.get_band_hashes(
+                minhash.get_signature('{}\n{}'.format(title, description)))))
+        if len(bands) >= 10000:
+            IssueSimilarityBand.objects.bulk_create(bands)
+            bands = []
+    IssueSimilarityBand.objects.bulk_create(bands)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_issue_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueSimilarityBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('hash', models.BigIntegerField()),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_bands', to='core.Issue')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='issuesimilarityband',
+            index=models.Index(fields=['band', 'hash'], name='core_issues_band_b9b2ea_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuesimilarityband',
+            unique_together={('issue', 'band')},
+        ),
+        migrations.RunPython(
+            fill_issue_similarity_bands,
+            migrations.RunPython.noop,
+            elidable=True),
+    ]
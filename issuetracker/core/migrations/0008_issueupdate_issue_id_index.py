@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_issuesimilarityband'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issueupdate',
+            index=models.Index(fields=['issue', '-id'], name='core_issueu_issue_i_3b6a2c_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.0.13 on 2026-10-19 01:46
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_issue_counters(apps, schema_editor):
+    """Create `IssueCounter`s from existing issues.
+
+    Has to duplicate `IssueCounter.repair`, as custom methods of models
+    are not available in migrations.
+    """
+    Issue = apps.get_model('core', 'Issue')
+    IssueCounter = apps.get_model('core', 'IssueCounter')
+
+    counters = []
+    for field_name in ('status', 'category', 'submitter', 'solver'):
+        rows = Issue.objects.filter(**{field_name + '__isnull': False}) \
+            .order_by().values_list(field_name).annotate(
+                total_count=Count('id'),
+                open_count=Count('id', filter=~Q(status__is_solved=True)))
+        counters.extend(
+            IssueCounter(field_name=field_name, value=value,
+                         total_count=total_count, open_count=open_count)
+            for value, total_count, open_count in rows)
+    IssueCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_issueupdate_issue_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=30)),
+                ('value', models.IntegerField(help_text='Primary key of related object.')),
+                ('total_count', models.IntegerField(default=0)),
+                ('open_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuecounter',
+            unique_together={('field_name', 'value')},
+        ),
+        migrations.RunPython(
+            fill_issue_counters,
+            migrations.RunPython.noop,
+            elidable=True),
+    ]
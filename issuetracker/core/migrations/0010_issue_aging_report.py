@@ -0,0 +1,57 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_issuecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssueAgingCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.IntegerField(help_text='Primary key of `IssueCategory`.', null=True)),
+                ('status', models.IntegerField(help_text='Primary key of `IssueStatus`.', null=True)),
+                ('bucket', models.PositiveSmallIntegerField(choices=[(0, '0-1 days'), (1, '1-7 days'), (2, '7-30 days'), (3, 'over 30 days')])),
+                ('count', models.IntegerField(default=0)),
+                ('breached_count', models.IntegerField(default=0, help_text='Number of the issues that breach SLA.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IssueAgingEntry',
+            fields=[
+                ('issue', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aging_entry', serialize=False, to='core.Issue')),
+                ('category', models.IntegerField(db_index=True, help_text='Primary key of `IssueCategory` of the issue.', null=True)),
+                ('status', models.IntegerField(db_index=True, help_text='Primary key of `IssueStatus` of the issue.', null=True)),
+                ('created_at', models.DateTimeField()),
+                ('bucket', models.PositiveSmallIntegerField(choices=[(0, '0-1 days'), (1, '1-7 days'), (2, '7-30 days'), (3, 'over 30 days')])),
+                ('breaches_sla', models.BooleanField()),
+                ('rolls_over_at', models.DateTimeField(db_index=True, help_text='When the issue crosses the next bucket or SLA boundary, if any.', null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'issue aging entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='IssueAgingReport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_issue_update_id', models.IntegerField(default=0, help_text='Primary key of the latest `IssueUpdate` reflected in the report.')),
+                ('sla_days', models.PositiveIntegerField(help_text='`ISSUE_SLA_DAYS` the report was built with.', null=True)),
+                ('refreshed_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='issueagingentry',
+            index=models.Index(fields=['breaches_sla', 'created_at'], name='core_issuea_breache_ae9c55_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issueagingcount',
+            unique_together={('category', 'status', 'bucket')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_issue_aging_report'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['updated_at'], name='core_issue_updated_1db01c_idx'),
+        ),
+    ]
@@ -0,0 +1,141 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_data_to_default_project(apps, schema_editor):
+    """Create the default project and add existing data to it.
+
+    Has to duplicate `Project.get_default`, as custom methods of models
+    are not available in migrations.
+    """
+    Project = apps.get_model('core', 'Project')
+    using = schema_editor.connection.alias
+
+    models_owned = [apps.get_model('core', model_name) for model_name in
+                    ('IssueStatus', 'IssueCategory', 'Issue', 'IssueUpdate')]
+    if not any(model.objects.using(using).exists()
+               for model in models_owned):
+        return
+    project = Project.objects.using(using).create(title="Default")
+    for model in models_owned:
+        model.objects.using(using).update(project=project.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_issue_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=50, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('database', models.CharField(default='default', help_text="Alias of the DB the data of the project is stored in. Can't be changed, as the data is not moved.", max_length=30)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issues', to='core.Project'),
+        ),
+        migrations.AddField(
+            model_name='issuecategory',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_categories', to='core.Project'),
+        ),
+        migrations.AddField(
+            model_name='issuestatus',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_statuses', to='core.Project'),
+        ),
+        migrations.AddField(
+            model_name='issueupdate',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_updates', to='core.Project'),
+        ),
+        migrations.RunPython(
+            add_data_to_default_project,
+            migrations.RunPython.noop,
+            elidable=True),
+        migrations.AlterField(
+            model_name='issue',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issues', to='core.Project'),
+        ),
+        migrations.AlterField(
+            model_name='issuecategory',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_categories', to='core.Project'),
+        ),
+        migrations.AlterField(
+            model_name='issuestatus',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_statuses', to='core.Project'),
+        ),
+        migrations.AlterField(
+            model_name='issueupdate',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_updates', to='core.Project'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='solver',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solved_issues', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='submitter',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submitted_issues', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='issueupdate',
+            name='solver',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solved_issue_updates', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='issueupdate',
+            name='submitter',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submitted_issue_updates', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='issuecategory',
+            name='title',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='issuestatus',
+            name='title',
+            field=models.CharField(max_length=30),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuecategory',
+            unique_together={('project', 'title')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuestatus',
+            unique_together={('project', 'title')},
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', '-id'], name='core_issue_project_fb909e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'status'], name='core_issue_project_abfc15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'category'], name='core_issue_project_1e23ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'solver'], name='core_issue_project_2a2178_idx'),
+        ),
+    ]
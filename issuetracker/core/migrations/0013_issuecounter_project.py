@@ -0,0 +1,61 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:32
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def refill_issue_counters(apps, schema_editor):
+    """Replace `IssueCounter`s with ones counted per project.
+
+    Has to duplicate `IssueCounter.repair`, as custom methods of models
+    are not available in migrations.
+    """
+    Issue = apps.get_model('core', 'Issue')
+    IssueCounter = apps.get_model('core', 'IssueCounter')
+    using = schema_editor.connection.alias
+
+    IssueCounter.objects.using(using).all().delete()
+    counters = []
+    for field_name in ('status', 'category', 'submitter', 'solver'):
+        rows = Issue.objects.using(using).filter(
+            **{field_name + '__isnull': False}).order_by().values_list(
+                'project', field_name).annotate(
+                    total_count=Count('id'),
+                    open_count=Count('id', filter=~Q(status__is_solved=True)))
+        counters.extend(
+            IssueCounter(project_id=project_id, field_name=field_name,
+                         value=value, total_count=total_count,
+                         open_count=open_count)
+            for project_id, value, total_count, open_count in rows)
+    IssueCounter.objects.using(using).bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issuecounter',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_counters', to='core.Project'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='issuecounter',
+            unique_together={('project', 'field_name', 'value')},
+        ),
+        # Counters are kept in DBs of projects, not only the default one.
+        migrations.RunPython(
+            refill_issue_counters,
+            migrations.RunPython.noop,
+            hints={'model_name': 'issuecounter'},
+            elidable=True),
+        migrations.AlterField(
+            model_name='issuecounter',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='issue_counters', to='core.Project'),
+        ),
+    ]
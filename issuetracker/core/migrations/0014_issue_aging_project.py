@@ -0,0 +1,57 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:34
+
+from django.db import migrations, models
+
+
+def clear_issue_aging_report(apps, schema_editor):
+    """Clear the issue aging report, so that its next refresh rebuilds it.
+
+    Existing entries and counts don't have projects of issues.
+    """
+    IssueAgingReport = apps.get_model('core', 'IssueAgingReport')
+    IssueAgingEntry = apps.get_model('core', 'IssueAgingEntry')
+    IssueAgingCount = apps.get_model('core', 'IssueAgingCount')
+    using = schema_editor.connection.alias
+
+    IssueAgingEntry.objects.using(using).all().delete()
+    IssueAgingCount.objects.using(using).all().delete()
+    IssueAgingReport.objects.using(using).update(refreshed_at=None)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_issuecounter_project'),
+    ]
+
+    operations = [
+        # The report is kept in DBs of projects, not only the default one.
+        migrations.RunPython(
+            clear_issue_aging_report,
+            migrations.RunPython.noop,
+            hints={'model_name': 'issueagingreport'},
+            elidable=True),
+        migrations.RemoveIndex(
+            model_name='issueagingentry',
+            name='core_issuea_breache_ae9c55_idx',
+        ),
+        migrations.AddField(
+            model_name='issueagingcount',
+            name='project',
+            field=models.IntegerField(default=0, help_text='Primary key of `Project`.'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='issueagingentry',
+            name='project',
+            field=models.IntegerField(default=0, help_text='Primary key of `Project` of the issue.'),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name='issueagingcount',
+            unique_together={('project', 'category', 'status', 'bucket')},
+        ),
+        migrations.AddIndex(
+            model_name='issueagingentry',
+            index=models.Index(fields=['project', 'breaches_sla', 'created_at'], name='core_issuea_project_452af4_idx'),
+        ),
+    ]
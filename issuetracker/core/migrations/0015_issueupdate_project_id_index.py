@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_issue_aging_project'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issueupdate',
+            index=models.Index(fields=['project', 'id'], name='core_issueu_project_946cb2_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.0.13 on 2026-10-19 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_issueupdate_project_id_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='issueupdate',
+            name='core_issueu_issue_i_3b6a2c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='issueupdate',
+            index=models.Index(fields=['issue', '-updated_at', '-id'], name='core_issueu_issue_i_b1a3fc_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+"""MinHash signatures and locality-sensitive hashing of issue texts.
+
+Texts are split into word shingles, a signature of `NUM_PERMUTATIONS`
+minimum hash values is computed from them, and the signature is split
+into `NUM_BANDS` bands. Texts that share at least one band hash are
+candidate near-duplicates; the probability of that is high for texts
+with Jaccard similarity of shingles above ~0.5, and low below it.
+"""
+import hashlib
+import random
+import re
+import struct
+from typing import List, Set
+
+
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed seed, as signatures are stored in DB and must stay comparable.
+_random = random.Random(0x155E)
+_PERMUTATIONS = [(_random.randrange(1, _MERSENNE_PRIME),
+                  _random.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+_WORD_RE = re.compile(r'\w+')
+
+
+def _hash(value: (bytes, "Value to hash")) -> int:
+    """Return stable (between processes) 64-bit hash of the value."""
+    return struct.unpack('<Q', hashlib.sha1(value).digest()[:8])[0]
+
+
+def get_shingles(text: (str, "Text to split into shingles")) -> Set[str]:
+    """Return set of word bigrams of the text.
+
+    A text of a single word yields that word as its only shingle.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) == 1:
+        return set(words)
+    return {' '.join(pair) for pair in zip(words, words[1:])}
+
+
+def get_signature(text: (str, "Text to compute signature of")) -> List[int]:
+    """Return MinHash signature of the text.
+
+    Empty list is returned if the text has no words.
+    """
+    hashes = [_hash(shingle.encode()) for shingle in get_shingles(text)]
+    if not hashes:
+        return []
+    return [min((a * hash_ + b) % _MERSENNE_PRIME for hash_ in hashes)
+            for a, b in _PERMUTATIONS]
+
+
+def get_band_hashes(
+        signature: (List[int], "MinHash signature")) -> List[int]:
+    """Return hashes of signature bands, one per band.
+
+    Hashes fit into signed 64-bit integer to be stored in
+    `BigIntegerField`.
+    """
+    if not signature:
+        return []
+    return [
+        _hash(struct.pack(
+            '<{}Q'.format(ROWS_PER_BAND),
+            *signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+        >> 1
+        for band in range(NUM_BANDS)]
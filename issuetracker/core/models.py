@@ -1,17 +1,104 @@
 """Models of the `core` app."""
-from typing import Union, Iterable
+import bisect
+import difflib
+from datetime import datetime, timedelta
+from typing import Union, Iterable, Callable, List, Tuple, Dict, Set
 
-from django.db import models, transaction
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, models, router, transaction
+from django.db.models import DEFERRED, F, Q, Count, Subquery, Sum
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.auth.models import User
 
-from .middleware import get_current_user
+from . import minhash
+from .middleware import get_current_project, get_current_user, use_project
+
+
+class IssueVersionConflict(Exception):
+    """Raised when an `Issue` was modified since it was loaded."""
+
+
+class Project(models.Model):
+    """Project that owns issues, their statuses and categories.
+
+    The project is stored in the default DB, while data it owns is
+    stored in DB `database` (see `core.routers.ProjectRouter`), which
+    allows to place large projects on separate DBs. Relations to the
+    project (and to users) have no DB constraints, as they may cross
+    DBs, and deletion of a project doesn't delete its data.
+    """
+
+    title = models.CharField(max_length=50, unique=True)
+    description = models.TextField(blank=True)
+    database = models.CharField(
+        max_length=30, default=DEFAULT_DB_ALIAS,
+        help_text="Alias of the DB the data of the project is stored in."
+        " Can't be changed, as the data is not moved.")
+
+    def clean(self):
+        """Validate `database` is a configured DB alias."""
+        if self.database not in settings.DATABASES:
+            raise ValidationError({'database': "Unknown DB alias."})
+
+    @classmethod
+    def get_default(cls) -> "Project":
+        """Return the first project, creating it if there is none.
+
+        It owns data created without a current project (see
+        `core.middleware.get_current_project`).
+        """
+        project = cls.objects.order_by('pk').first()
+        if project is None:
+            project = cls.objects.get_or_create(title="Default")[0]
+        return project
+
+    @classmethod
+    def get_one_per_database(cls) -> List["Project"]:
+        """Return a project of each DB that stores data of projects.
+
+        Making such project current (see `core.middleware.use_project`)
+        routes queries to its DB, e.g. to maintain data of all projects
+        of the DB.
+        """
+        return sorted({project.database: project
+                       for project in cls.objects.order_by('-pk')}.values(),
+                      key=lambda project: project.database)
+
+    def __str__(self):
+        """Return str representation of the instance."""
+        return "Project `{}`".format(self.title)
+
+
+def _set_project_if_missing(
+        instance: (models.Model, "Unsaved instance owned by a project")):
+    """Set the current project (or the default one) to the instance."""
+    if instance.project_id is None:
+        instance.project = get_current_project() or Project.get_default()
+
+
+def _use_project_of(
+        instance: (models.Model, "Instance owned by a project")):
+    """Return context manager that makes project of the instance current.
+
+    Queries of side effects of saving the instance are made to DB of its
+    project then. The project is not loaded if it's already current.
+    """
+    project = get_current_project()
+    if project is not None and project.pk == instance.project_id:
+        return use_project(None)
+    return use_project(instance.project)
 
 
 class IssueStatus(models.Model):
     """Status of an issue."""
 
-    title = models.CharField(max_length=30, unique=True)
+    project = models.ForeignKey(
+        Project, models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name='issue_statuses')
+    title = models.CharField(max_length=30)
     description = models.TextField(blank=True)
     is_solved = models.BooleanField()
 
@@ -19,6 +106,33 @@ class IssueStatus(models.Model):
         """Meta attributes of `IssueCategory` model."""
 
         verbose_name_plural = 'issue statuses'
+        unique_together = [('project', 'title')]
+
+    def save(self,
+             force_insert: (bool, "Force using SQL INSERT") = False,
+             force_update: (bool, "Force using SQL UPDATE") = False,
+             using: (str, "Alias of the DB to use") = None,
+             update_fields: (Union[Iterable, None],
+                             "Fields which valus to save to DB. `None`"
+                             " will cause all fields to be saved, empty"
+                             " iterable will abort saving.") = None):
+        """Save the instance to DB.
+
+        A new status is added to the current (or the default) project.
+
+        Side effect: update open issue counts of `IssueCounter`s if
+        `is_solved` has changed.
+        """
+        _set_project_if_missing(self)
+        using = using or router.db_for_write(type(self), instance=self)
+        with _use_project_of(self), transaction.atomic(using=using):
+            was_solved = type(self).objects.filter(pk=self.pk).values_list(
+                'is_solved', flat=True).first() if self.pk else None
+            super().save(force_insert, force_update, using, update_fields)
+            if was_solved is not None and was_solved != self.is_solved:
+                IssueCounter.add_open_counts_of_issues(
+                    Issue.objects.filter(status=self),
+                    -1 if self.is_solved else 1)
 
     def __str__(self):
         """Return str representation of the instance."""
@@ -28,13 +142,32 @@ class IssueStatus(models.Model):
 class IssueCategory(models.Model):
     """Category of an issue."""
 
-    title = models.CharField(max_length=50, unique=True)
+    project = models.ForeignKey(
+        Project, models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name='issue_categories')
+    title = models.CharField(max_length=50)
     description = models.TextField(blank=True)
 
     class Meta:
         """Meta attributes of `IssueCategory` model."""
 
         verbose_name_plural = 'issue categories'
+        unique_together = [('project', 'title')]
+
+    def save(self,
+             force_insert: (bool, "Force using SQL INSERT") = False,
+             force_update: (bool, "Force using SQL UPDATE") = False,
+             using: (str, "Alias of the DB to use") = None,
+             update_fields: (Union[Iterable, None],
+                             "Fields which valus to save to DB. `None`"
+                             " will cause all fields to be saved, empty"
+                             " iterable will abort saving.") = None):
+        """Save the instance to DB.
+
+        A new category is added to the current (or the default) project.
+        """
+        _set_project_if_missing(self)
+        super().save(force_insert, force_update, using, update_fields)
 
     def __str__(self):
         """Return str representation of the instance."""
@@ -48,6 +181,9 @@ class IssueBase(models.Model):
     without inheriting it's behavior.
     """
 
+    project = models.ForeignKey(
+        Project, models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name='issues')
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     status = models.ForeignKey(IssueStatus, models.SET_NULL, null=True)
@@ -56,9 +192,12 @@ class IssueBase(models.Model):
     # intellectual rights to issues - the tracker or their submitters
     # (or if submitters allowed issues to stay). Using `models.SET_NULL`
     # allows to delete the user's issues before it's account is deleted.
+    # Users are stored in the default DB, see `Project`.
     submitter = models.ForeignKey(User, models.SET_NULL, null=True,
+                                  db_constraint=False,
                                   related_name='submitted_issues')
     solver = models.ForeignKey(User, models.SET_NULL, null=True, blank=True,
+                               db_constraint=False,
                                related_name='solved_issues')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -76,25 +215,53 @@ class IssueBase(models.Model):
 class Issue(IssueBase):
     """Representation of the core object of the project - an issue."""
 
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Incremented on each update, used to detect concurrent"
+        " modifications.")
+
+    class Meta:
+        """Meta attributes of `Issue` model."""
+
+        indexes = [
+            # Issues are listed and filtered within a project.
+            models.Index(fields=['project', '-id']),
+            models.Index(fields=['project', 'status']),
+            models.Index(fields=['project', 'category']),
+            models.Index(fields=['project', 'solver']),
+            # Used to refresh `core.analytics` snapshot.
+            models.Index(fields=['updated_at']),
+        ]
+
     @classmethod
     def from_db(cls, db, field_names, values):
         """Load field values from DB.
 
-        Save values of the field `status.is_solved` to attribute
-        `_initial_status_is_solved` and `solved_at` to attribute
-        `_initial_solved_at` for later use in `save`.
+        Save values of the field `status_id` to attribute
+        `_initial_status_id`, `solved_at` to `_initial_solved_at`,
+        `title` to `_initial_title` and `description` to
+        `_initial_description` for later use in `save`, or `DEFERRED`
+        if the field was not loaded. The status itself is not accessed,
+        as related objects are not yet populated by `select_related` at
+        this point.
         """
         instance = super().from_db(db, field_names, values)
-        instance._initial_status_is_solved = instance.status.is_solved \
-            if instance.status else False
-        instance._initial_solved_at = instance.solved_at
+        instance._initial_status_id = instance.__dict__.get(
+            'status_id', DEFERRED)
+        instance._initial_solved_at = instance.__dict__.get(
+            'solved_at', DEFERRED)
+        instance._initial_title = instance.__dict__.get('title', DEFERRED)
+        instance._initial_description = instance.__dict__.get(
+            'description', DEFERRED)
         return instance
 
     def __init__(self, *args, **kwargs):
         """Initialize the instance."""
         super().__init__(*args, **kwargs)
-        self._initial_status_is_solved = False
+        self._initial_status_id = None
         self._initial_solved_at = None
+        self._initial_title = None
+        self._initial_description = None
 
     def save(self,
              force_insert: (bool, "Force using SQL INSERT") = False,
@@ -107,26 +274,38 @@ class Issue(IssueBase):
         """Save the instance to DB.
 
         If the issue is created, `submitter` will be set to the current
-        user. If the issue becomes solved, `solver` will be set to the
-        current user, and `solved_at` to the current time. Warning: if
+        user, and `project` to the current (or the default) project, if
+        it's not set. If the issue becomes solved, `solver` will be set to
+        the current user, and `solved_at` to the current time. Warning: if
         you have passed an iterable for argument `update_fields` that
         does not include fields named above, they will be set on the
         object, but not saved to the DB.
 
-        Side effect: create `IssueUpdate`.
+        The update is only applied if `version` in DB still matches the
+        one of the instance, otherwise `IssueVersionConflict` is raised
+        and nothing is saved.
+
+        Side effects: create `IssueUpdate`, update `IssueCounter`s,
+        update `IssueSimilarityBand`s of the issue if its `title` or
+        `description` has changed since it was loaded.
         """
         if update_fields is not None and not update_fields:
             return
         if not self.pk:
             self.submitter = get_current_user()
-        self._set_solver_and_solved_at_if_became_solved(update_fields)
+            _set_project_if_missing(self)
 
         field_names = [field_name for field_name in
                        {f.name for f in self._meta.get_fields()} &
                        {f.name for f in IssueUpdate._meta.get_fields()}
                        if field_name != 'id']
 
-        with transaction.atomic():
+        # Side effects are written to DB of the project of the issue.
+        using = using or router.db_for_write(type(self), instance=self)
+        with _use_project_of(self), transaction.atomic(using=using):
+            self._set_solver_and_solved_at_if_became_solved(update_fields)
+            counted_values_in_db = IssueCounter.get_counted_values(
+                type(self).objects.filter(pk=self.pk)) if self.pk else None
             super().save(force_insert, force_update, using, update_fields)
 
             if update_fields is None:
@@ -140,13 +319,120 @@ class Issue(IssueBase):
 
             IssueUpdate.objects.create(issue=self, **fields2values)
 
+            counted_values = {
+                field_name: getattr(fields2values[field_name], 'pk', None)
+                for field_name in IssueCounter.FIELD_NAMES + ('project',)}
+            counted_values['is_open'] = not (
+                fields2values['status'] and fields2values['status'].is_solved)
+            IssueCounter.apply_issue_change(counted_values_in_db,
+                                            counted_values)
+
+            texts = (fields2values['title'], fields2values['description'])
+            if texts != (self._initial_title, self._initial_description):
+                IssueSimilarityBand.update_for_issue(self, *texts)
+                # In case of a second `save` call on the same object.
+                self._initial_title, self._initial_description = texts
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        """Update the row only if its `version` matches `self.version`.
+
+        Conditional `UPDATE` is used instead of `SELECT FOR UPDATE` to
+        not block concurrent readers and writers of the issue. Return
+        False if the row doesn't exist (so Django inserts it), raise
+        `IssueVersionConflict` if it was updated by someone else.
+        """
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, F('version') + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=self.version), using, pk_val, values,
+            update_fields, forced_update)
+        if updated:
+            self.version += 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise IssueVersionConflict(
+                "{} was modified since it was loaded.".format(self))
+        return updated
+
+    @classmethod
+    def update_with_retries(
+            cls,
+            pk: (int, "Primary key of the issue to update"),
+            modify: (Callable[["Issue"], None],
+                     "Function that modifies the loaded issue in place"),
+            attempts: (int, "Maximum number of attempts") = 3) -> "Issue":
+        """Load the issue, apply `modify` to it, and save it.
+
+        On `IssueVersionConflict` the issue is reloaded and `modify` is
+        applied again, so it must not depend on the state of previously
+        loaded instances. The last conflict is reraised if all attempts
+        have failed.
+        """
+        for attempt in range(attempts):
+            issue = cls.objects.get(pk=pk)
+            modify(issue)
+            try:
+                issue.save()
+            except IssueVersionConflict:
+                if attempt == attempts - 1:
+                    raise
+            else:
+                return issue
+
+    @classmethod
+    def find_similar(
+            cls,
+            title: (str, "Title of the issue to find duplicates of"),
+            description: (str, "Its description"),
+            exclude_pk: (Union[int, None],
+                         "Primary key of the issue itself, if saved") = None,
+            limit: (int, "Maximum number of issues to return") = 5,
+            project: (Union[Project, None],
+                      "Return only issues of the project") = None
+            ) -> List[Tuple["Issue", float]]:
+        """Return likely duplicates of an issue with given texts.
+
+        Issues are looked up by `IssueSimilarityBand` index, without
+        scanning the issues table. Return list of tuples of an issue
+        and its estimated similarity (share of matching bands), most
+        similar first.
+        """
+        band_hashes = minhash.get_band_hashes(
+            minhash.get_signature(_get_similarity_text(title, description)))
+        if not band_hashes:
+            return []
+        condition = Q()
+        for band, hash_ in enumerate(band_hashes):
+            condition |= Q(band=band, hash=hash_)
+        matches = IssueSimilarityBand.objects.filter(condition)
+        if exclude_pk is not None:
+            matches = matches.exclude(issue_id=exclude_pk)
+        if project is not None:
+            matches = matches.filter(issue__project=project)
+        matches = list(matches.values_list('issue_id')
+                       .annotate(count=Count('id'))
+                       .order_by('-count', '-issue_id')[:limit])
+        issues = cls.objects.in_bulk([issue_id for issue_id, _ in matches])
+        return [(issues[issue_id], count / minhash.NUM_BANDS)
+                for issue_id, count in matches if issue_id in issues]
+
     def _set_solver_and_solved_at_if_became_solved(self, update_fields):
         """Set `self.solved_at` and `self.solver` if appropriate.
 
         Set `self.solved_at` to the current time if became solved and
         wasn't changed manually (in comparison to the value the instance
-        was loaded with).
+        was loaded with). Values of fields that were deferred when the
+        instance was loaded are read from DB.
         """
+        if self.pk and DEFERRED in (self._initial_status_id,
+                                    self._initial_solved_at):
+            initial = type(self).objects.filter(pk=self.pk).values(
+                'status_id', 'solved_at').first() or {}
+            if self._initial_status_id is DEFERRED:
+                self._initial_status_id = initial.get('status_id')
+            if self._initial_solved_at is DEFERRED:
+                self._initial_solved_at = initial.get('solved_at')
         if self.solved_at != self._initial_solved_at:
             became_solved = False
         elif update_fields and 'status' not in update_fields:
@@ -154,7 +440,9 @@ class Issue(IssueBase):
         elif not self.status or not self.status.is_solved:
             became_solved = False
         elif self.pk:
-            became_solved = not self._initial_status_is_solved
+            became_solved = self.status_id != self._initial_status_id \
+                and not IssueStatus.objects.filter(
+                    pk=self._initial_status_id, is_solved=True).exists()
         else:
             became_solved = True
 
@@ -169,20 +457,305 @@ class Issue(IssueBase):
         return "Issue {}: `{}`".format(self.pk, self.title)
 
 
+class IssueCounter(models.Model):
+    """Denormalized count of issues with a value of a field.
+
+    Kept up to date by `Issue.save`, `IssueStatus.save` and deletion of
+    related objects, so that counts don't need `GROUP BY` over all
+    issues. Issues are counted per project, those without a value of
+    the field are not counted.
+    """
+
+    FIELD_NAMES = ('status', 'category', 'submitter', 'solver')
+
+    project = models.ForeignKey(
+        Project, models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name='issue_counters')
+    field_name = models.CharField(max_length=30)
+    value = models.IntegerField(help_text="Primary key of related object.")
+    total_count = models.IntegerField(default=0)
+    open_count = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta attributes of `IssueCounter` model."""
+
+        unique_together = [('project', 'field_name', 'value')]
+
+    @classmethod
+    def get_counts(cls,
+                   field_name: (str, "One of `FIELD_NAMES`"),
+                   values: (Union[Iterable[int], None],
+                            "Values to get counts of, all if None") = None,
+                   project: (Union[Project, None],
+                             "Project to get counts of, all if None") = None
+                   ) -> Dict[int, "IssueCounter"]:
+        """Return counters of the field by its values.
+
+        Counts of all projects are returned as sums in unsaved counters.
+        """
+        counters = cls.objects.filter(field_name=field_name)
+        if values is not None:
+            counters = counters.filter(value__in=values)
+        if project is not None:
+            return {counter.value: counter
+                    for counter in counters.filter(project=project)}
+        return {row['value']: cls(field_name=field_name, **row)
+                for row in counters.order_by().values('value').annotate(
+                    total_count=Sum('total_count'),
+                    open_count=Sum('open_count'))}
+
+    @classmethod
+    def get_counted_values(
+            cls,
+            issues: (models.QuerySet,
+                     "Queryset of a single issue, possibly empty")
+            ) -> Union[Dict, None]:
+        """Return values of the issue counted by `IssueCounter`s.
+
+        Return dict of `FIELD_NAMES` and `project` to primary keys of
+        related objects and `is_open`, or None if the issue doesn't
+        exist.
+        """
+        values = issues.values(*cls.FIELD_NAMES, 'project',
+                               'status__is_solved').first()
+        if values is not None:
+            values['is_open'] = not values.pop('status__is_solved')
+        return values
+
+    @classmethod
+    def apply_issue_change(
+            cls,
+            old: (Union[Dict, None],
+                  "Counted values of the issue before the change, see"
+                  " `get_counted_values`, None if it was created"),
+            new: (Union[Dict, None],
+                  "Counted values after the change, None if it was"
+                  " deleted")):
+        """Move the issue between counters according to the change.
+
+        Counters are updated in order of `FIELD_NAMES`, projects and
+        values, so that concurrent changes lock them in the same order
+        and don't deadlock.
+        """
+        for field_name in cls.FIELD_NAMES:
+            old_key = (old['project'], old[field_name], old['is_open']) \
+                if old else None
+            new_key = (new['project'], new[field_name], new['is_open']) \
+                if new else None
+            if old_key == new_key:
+                continue
+            deltas = {}
+            for values, sign in ((old, -1), (new, 1)):
+                if values and values[field_name] is not None:
+                    delta = deltas.setdefault(
+                        (values['project'], values[field_name]), [0, 0])
+                    delta[0] += sign
+                    delta[1] += sign * int(values['is_open'])
+            for project_id, value in sorted(deltas):
+                cls._add(field_name, project_id, value,
+                         *deltas[project_id, value])
+
+    @classmethod
+    def add_open_counts_of_issues(
+            cls,
+            issues: (models.QuerySet, "Issues which open state has changed"),
+            delta: (int, "1 if the issues became open, -1 otherwise"),
+            field_names: (Iterable[str],
+                          "Fields to update counters of") = FIELD_NAMES):
+        """Update open counts of the issues with a `GROUP BY` query each.
+
+        Counters are updated in the same order as by
+        `apply_issue_change`.
+        """
+        for field_name in sorted(field_names, key=cls.FIELD_NAMES.index):
+            for project_id, value, count in issues.order_by(
+                    'project', field_name).values_list(
+                        'project', field_name).annotate(count=Count('id')):
+                cls._add(field_name, project_id, value, 0, delta * count)
+
+    @classmethod
+    def _add(cls, field_name, project_id, value, total_count, open_count):
+        """Add given numbers to the counter, creating it if needed."""
+        if value is None:
+            return
+        counters = cls.objects.filter(project_id=project_id,
+                                      field_name=field_name, value=value)
+        changes = {'total_count': F('total_count') + total_count,
+                   'open_count': F('open_count') + open_count}
+        if not counters.update(**changes):
+            cls.objects.get_or_create(project_id=project_id,
+                                      field_name=field_name, value=value)
+            counters.update(**changes)
+
+    @classmethod
+    def get_expected_counts(cls) -> Dict[Tuple[str, int, int],
+                                         Tuple[int, int]]:
+        """Return counts computed from issues, one query per field.
+
+        Return dict of (field name, project primary key, value) to
+        (total, open) counts.
+        """
+        counts = {}
+        for field_name in cls.FIELD_NAMES:
+            rows = Issue.objects.filter(**{field_name + '__isnull': False}) \
+                .order_by().values_list('project', field_name).annotate(
+                    total_count=Count('id'),
+                    open_count=Count('id', filter=~Q(status__is_solved=True)))
+            for project_id, value, total_count, open_count in rows:
+                counts[field_name, project_id, value] = (total_count,
+                                                         open_count)
+        return counts
+
+    @classmethod
+    def get_drift(cls) -> Dict[Tuple[str, int, int],
+                               Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """Return counters which differ from counts computed from issues.
+
+        Return dict of (field name, project primary key, value) to pairs
+        of stored and expected (total, open) counts. Counters with zero
+        counts are equal to absent ones.
+        """
+        stored = {(counter.field_name, counter.project_id, counter.value):
+                  (counter.total_count, counter.open_count)
+                  for counter in cls.objects.all()}
+        expected = cls.get_expected_counts()
+        return {key: (stored.get(key, (0, 0)), expected.get(key, (0, 0)))
+                for key in stored.keys() | expected.keys()
+                if stored.get(key, (0, 0)) != expected.get(key, (0, 0))}
+
+    @classmethod
+    def repair(cls):
+        """Replace all counters with counts computed from issues."""
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                cls(field_name=field_name, project_id=project_id,
+                    value=value, total_count=total_count,
+                    open_count=open_count)
+                for (field_name, project_id, value),
+                (total_count, open_count)
+                in cls.get_expected_counts().items())
+
+    def __str__(self):
+        """Return str representation of the instance."""
+        return "IssueCounter of `{}` {} of project {}: {} open of {}".format(
+            self.field_name, self.value, self.project_id, self.open_count,
+            self.total_count)
+
+
+@receiver(pre_delete, sender=Issue)
+def _uncount_issue(sender, instance, **kwargs):
+    """Remove the issue being deleted from `IssueCounter`s."""
+    IssueCounter.apply_issue_change(
+        IssueCounter.get_counted_values(
+            Issue.objects.filter(pk=instance.pk)),
+        None)
+
+
+@receiver(pre_delete, sender=IssueStatus)
+def _uncount_issue_status(sender, instance, **kwargs):
+    """Update `IssueCounter`s for the status being deleted.
+
+    Its issues will have no status, thus will become open.
+    """
+    if instance.is_solved:
+        IssueCounter.add_open_counts_of_issues(
+            Issue.objects.filter(status=instance), 1,
+            [field_name for field_name in IssueCounter.FIELD_NAMES
+             if field_name != 'status'])
+    IssueCounter.objects.filter(project=instance.project_id,
+                                field_name='status',
+                                value=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=IssueCategory)
+def _uncount_issue_category(sender, instance, **kwargs):
+    """Delete `IssueCounter` of the category being deleted."""
+    IssueCounter.objects.filter(project=instance.project_id,
+                                field_name='category',
+                                value=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=User)
+def _uncount_user(sender, instance, **kwargs):
+    """Delete `IssueCounter`s of the user being deleted."""
+    IssueCounter.objects.filter(field_name__in=['submitter', 'solver'],
+                                value=instance.pk).delete()
+
+
+def _get_similarity_text(title: (str, "Title of an issue"),
+                         description: (str, "Description of an issue")
+                         ) -> str:
+    """Return text of an issue used to find its duplicates."""
+    return '{}\n{}'.format(title, description)
+
+
+class IssueSimilarityBand(models.Model):
+    """Locality-sensitive hash of a band of `Issue`'s MinHash signature.
+
+    Issues sharing a `hash` of the same `band` are likely near-duplicate
+    (see `core.minhash`). Kept up to date by `Issue.save`.
+    """
+
+    issue = models.ForeignKey(Issue, models.CASCADE,
+                              related_name='similarity_bands')
+    band = models.PositiveSmallIntegerField()
+    hash = models.BigIntegerField()
+
+    class Meta:
+        """Meta attributes of `IssueSimilarityBand` model."""
+
+        unique_together = [('issue', 'band')]
+        indexes = [models.Index(fields=['band', 'hash'])]
+
+    @classmethod
+    def update_for_issue(cls,
+                         issue: (Issue, "Saved issue to update bands of"),
+                         title: (str, "Title of the issue in DB"),
+                         description: (str, "Description of the issue in DB")):
+        """Replace bands of the issue with ones of the given texts."""
+        cls.objects.filter(issue=issue).delete()
+        cls.objects.bulk_create(
+            cls(issue=issue, band=band, hash=hash_)
+            for band, hash_ in enumerate(minhash.get_band_hashes(
+                minhash.get_signature(
+                    _get_similarity_text(title, description)))))
+
+    def __str__(self):
+        """Return str representation of the instance."""
+        return "IssueSimilarityBand {} of `{}`".format(self.band, self.issue)
+
+
 class IssueUpdate(IssueBase):
     """Representation of an issue state after each modification.
 
-    Not currently being  read anywhere, but it's almost guaranteed that
-    the full history will be needed in the future.
+    Shown page by page as the issue history in the admin.
     """
 
+    # Fields shown in the issue history, with names of attributes to
+    # display related objects by.
+    HISTORY_FIELDS = (
+        ('title', None),
+        ('description', None),
+        ('status', 'title'),
+        ('category', 'title'),
+        ('submitter', 'username'),
+        ('solver', 'username'),
+        ('solved_at', None),
+    )
+
     issue = models.ForeignKey(Issue, models.CASCADE,
                               related_name='issue_updates')
     # Override to change `related_name`s in order to avoid clash with
     # reverse accessors to `Issue`.
+    project = models.ForeignKey(
+        Project, models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name='issue_updates')
     submitter = models.ForeignKey(User, models.SET_NULL, null=True,
+                                  db_constraint=False,
                                   related_name='submitted_issue_updates')
     solver = models.ForeignKey(User, models.SET_NULL, null=True,
+                               db_constraint=False,
                                related_name='solved_issue_updates')
     # Override to remove `auto_now` and `auto_now_add` arguments.
     created_at = models.DateTimeField()
@@ -192,8 +765,448 @@ class IssueUpdate(IssueBase):
         """Meta attributes of `IssueUpdate` model."""
 
         get_latest_by = ['updated_at', 'pk']
+        indexes = [models.Index(fields=['issue', '-updated_at', '-id']),
+                   models.Index(fields=['project', 'id'])]
+
+    @classmethod
+    def get_history_page(
+            cls,
+            issue_id: (int, "Primary key of the issue"),
+            before: (Union[int, None],
+                     "Primary key of the update to return only preceding"
+                     " ones of") = None,
+            page_size: (int, "Maximum number of updates to return") = 20
+            ) -> Tuple[List[Tuple["IssueUpdate", List[Dict]]],
+                       Union[int, None]]:
+        """Return a page of the issue updates, newest first.
+
+        Updates are ordered by `updated_at` (then by primary key), as an
+        update may be committed after ones saved later. Each update is paired with its changes in comparison to the
+        previous one (see `get_changes`). The page is fetched with a
+        single query (including names of related objects), together
+        with the update preceding the page to compare the last one to.
+        Names of users are fetched with another query if users are
+        stored in another DB (see `Project`).
+
+        Return tuple of the list of (update, changes) pairs and the
+        `before` value to get the next page with, or None if it's the
+        last page.
+        """
+        updates = cls.objects.filter(issue_id=issue_id)
+        if before is not None:
+            before_updated_at = Subquery(
+                cls.objects.filter(pk=before).values('updated_at'))
+            updates = updates.filter(
+                Q(updated_at__lt=before_updated_at) |
+                Q(updated_at=before_updated_at, pk__lt=before))
+        users_apart = updates.db != User.objects.db
+        relations = [(field_name, attname)
+                     for field_name, attname in cls.HISTORY_FIELDS
+                     if attname and not (users_apart and cls._meta.get_field(
+                         field_name).related_model is User)]
+        user_fields = [cls._meta.get_field(field_name)
+                       for field_name, attname in cls.HISTORY_FIELDS
+                       if attname and (field_name, attname) not in relations]
+        updates = list(
+            updates
+            .select_related(*[field_name for field_name, _ in relations])
+            .only('updated_at',
+                  *[field_name for field_name, _ in cls.HISTORY_FIELDS],
+                  *['{}__{}'.format(*relation) for relation in relations])
+            .order_by('-updated_at', '-pk')[:page_size + 1])
+        users = User.objects.only('username').in_bulk(
+            {getattr(update, field.attname) for update in updates
+             for field in user_fields} - {None})
+        for update in updates:
+            for field in user_fields:
+                user_id = getattr(update, field.attname)
+                if user_id is not None:
+                    # Users of other DBs are not set to NULL on deletion.
+                    setattr(update, field.name, users.get(user_id) or User(
+                        pk=user_id, username="(deleted)"))
+        page = [(update, update.get_changes(previous))
+                for update, previous in zip(updates[:page_size],
+                                            updates[1:] + [None])]
+        next_before = updates[page_size - 1].pk \
+            if len(updates) > page_size else None
+        return page, next_before
+
+    def get_changes(self,
+                    previous: (Union["IssueUpdate", None],
+                               "Update preceding this one, if any")
+                    ) -> List[Dict]:
+        """Return changes of `HISTORY_FIELDS` since the previous update.
+
+        Each change is a dict with `field` (verbose name), `old` and
+        `new` (displayed values). Change of `description` has `diff`
+        (list of lines of unified diff) instead of `old` and `new`.
+        """
+        changes = []
+        for field_name, attname in self.HISTORY_FIELDS:
+            field = self._meta.get_field(field_name)
+            old = getattr(previous, field.attname) if previous else None
+            new = getattr(self, field.attname)
+            if old == new or previous is None and new in (None, ''):
+                continue
+            if field_name == 'description':
+                changes.append({'field': field.verbose_name, 'diff': list(
+                    difflib.unified_diff(
+                        old.splitlines() if old else [], new.splitlines(),
+                        n=1, lineterm=''))[2:]})
+                continue
+            if attname:
+                old = getattr(getattr(previous, field_name), attname) \
+                    if old is not None else None
+                new = getattr(getattr(self, field_name), attname) \
+                    if new is not None else None
+            changes.append({'field': field.verbose_name,
+                            'old': old, 'new': new})
+        return changes
 
     def __str__(self):
         """Return str representation of the instance."""
         return "IssueUpdate {} of `{}` on {}".format(
             self.pk, self.issue, self.updated_at)
+
+
+class IssueAgingReport(models.Model):
+    """State of the materialized report of ages of open issues.
+
+    The report consists of an `IssueAgingEntry` per open issue and
+    `IssueAgingCount`s of them, and is read in constant time regardless
+    of the number of open issues. It is refreshed incrementally by
+    `refresh`, which is run on schedule by `refresh_issue_aging`
+    command. Only a single instance exists in each DB that stores data
+    of projects, and the report covers all projects of the DB.
+    """
+
+    last_issue_update_id = models.IntegerField(
+        default=0,
+        help_text="Primary key of the latest `IssueUpdate` reflected in"
+        " the report.")
+    sla_days = models.PositiveIntegerField(
+        null=True, help_text="`ISSUE_SLA_DAYS` the report was built with.")
+    refreshed_at = models.DateTimeField(null=True)
+
+    @classmethod
+    def get(cls) -> "IssueAgingReport":
+        """Return the instance, creating it if needed."""
+        return cls.objects.get_or_create(pk=1)[0]
+
+    @classmethod
+    def refresh(cls,
+                rebuild: (bool, "Rebuild the report from all open issues"
+                          ) = False,
+                now: (Union[datetime, None],
+                      "Time to compute ages at, the current if None") = None
+                ) -> int:
+        """Refresh the report, return number of refreshed issues.
+
+        The report is rebuilt if `rebuild` is passed, it was never
+        built, or `ISSUE_SLA_DAYS` setting has changed. Otherwise only
+        these issues are refreshed:
+        - updated since the last refresh (per `IssueUpdate`s);
+        - crossed a bucket or SLA boundary since the last refresh;
+        - of a status or category which number of open issues differs
+          from the one of `IssueCounter`s (e.g. a status has become
+          solved or was deleted).
+        """
+        now = now or timezone.now()
+        sla_days = settings.ISSUE_SLA_DAYS
+        with transaction.atomic():
+            cls.get()
+            report = cls.objects.select_for_update().get(pk=1)
+            last_issue_update_id = IssueUpdate.objects.order_by(
+                '-pk').values_list('pk', flat=True).first() or 0
+            if rebuild or report.refreshed_at is None \
+                    or report.sla_days != sla_days:
+                IssueAgingEntry.objects.all().delete()
+                IssueAgingCount.objects.all().delete()
+                drifted_values = {}
+                issue_ids = Issue.objects.filter(
+                    IssueAgingEntry.OPEN_ISSUES).values_list(
+                        'pk', flat=True).iterator()
+            else:
+                drifted_values = IssueAgingCount.get_drifted_values()
+                issue_ids = IssueAgingEntry.get_stale_issue_ids(
+                    report.last_issue_update_id, last_issue_update_id, now,
+                    drifted_values)
+            refreshed = IssueAgingEntry.refresh_issues(
+                issue_ids, now, timedelta(days=sla_days))
+            for field_name, values in drifted_values.items():
+                IssueAgingCount.recount(field_name, values)
+            report.last_issue_update_id = last_issue_update_id
+            report.sla_days = sla_days
+            report.refreshed_at = now
+            report.save()
+        return refreshed
+
+    def __str__(self):
+        """Return str representation of the instance."""
+        return "IssueAgingReport refreshed at {}".format(self.refreshed_at)
+
+
+class IssueAgingEntry(models.Model):
+    """Age bucket of an open issue in the aging report.
+
+    See `IssueAgingReport`.
+    """
+
+    # Lower boundaries of buckets after the first one, in days.
+    BUCKET_BOUNDARIES = (1, 7, 30)
+    BUCKET_TITLES = ("0-1 days", "1-7 days", "7-30 days", "over 30 days")
+    # Issues that are counted as open by `IssueCounter`s.
+    OPEN_ISSUES = ~Q(status__is_solved=True)
+    # Maximum number of issues refreshed with a single query.
+    BATCH_SIZE = 500
+
+    issue = models.OneToOneField(Issue, models.CASCADE, primary_key=True,
+                                 related_name='aging_entry')
+    project = models.IntegerField(
+        help_text="Primary key of `Project` of the issue.")
+    category = models.IntegerField(
+        null=True, db_index=True,
+        help_text="Primary key of `IssueCategory` of the issue.")
+    status = models.IntegerField(
+        null=True, db_index=True,
+        help_text="Primary key of `IssueStatus` of the issue.")
+    created_at = models.DateTimeField()
+    bucket = models.PositiveSmallIntegerField(
+        choices=list(enumerate(BUCKET_TITLES)))
+    breaches_sla = models.BooleanField()
+    rolls_over_at = models.DateTimeField(
+        null=True, db_index=True,
+        help_text="When the issue crosses the next bucket or SLA"
+        " boundary, if any.")
+
+    class Meta:
+        """Meta attributes of `IssueAgingEntry` model."""
+
+        verbose_name_plural = 'issue aging entries'
+        indexes = [models.Index(
+            fields=['project', 'breaches_sla', 'created_at'])]
+
+    @classmethod
+    def build(cls,
+              issue_id: (int, "Primary key of the issue"),
+              project: (int, "Primary key of its project"),
+              category: (Union[int, None], "Primary key of its category"),
+              status: (Union[int, None], "Primary key of its status"),
+              created_at: (datetime, "Creation time of the issue"),
+              now: (datetime, "Time to compute the age at"),
+              sla: (timedelta, "Maximum age of an issue within SLA")
+              ) -> "IssueAgingEntry":
+        """Return unsaved entry of the issue."""
+        age = now - created_at
+        boundaries = [timedelta(days=days) for days in cls.BUCKET_BOUNDARIES]
+        upcoming = [created_at + boundary for boundary in boundaries + [sla]
+                    if boundary > age]
+        return cls(issue_id=issue_id, project=project, category=category,
+                   status=status, created_at=created_at,
+                   bucket=bisect.bisect_right(boundaries, age),
+                   breaches_sla=age >= sla,
+                   rolls_over_at=min(upcoming) if upcoming else None)
+
+    @classmethod
+    def get_stale_issue_ids(
+            cls,
+            after_issue_update_id: (int, "Last `IssueUpdate` reflected"),
+            last_issue_update_id: (int, "Last `IssueUpdate` to reflect"),
+            now: (datetime, "Time to compute ages at"),
+            drifted_values: (Dict[str, Set[int]],
+                             "See `IssueAgingCount.get_drifted_values`")
+            ) -> Set[int]:
+        """Return primary keys of issues which entries are outdated."""
+        issue_ids = set(IssueUpdate.objects.filter(
+            pk__gt=after_issue_update_id,
+            pk__lte=last_issue_update_id).values_list('issue_id', flat=True))
+        issue_ids.update(cls.objects.filter(
+            rolls_over_at__lte=now).values_list('issue_id', flat=True))
+        for field_name, values in drifted_values.items():
+            issue_ids.update(cls.objects.filter(
+                **{field_name + '__in': values}).values_list(
+                    'issue_id', flat=True))
+            issue_ids.update(Issue.objects.filter(
+                cls.OPEN_ISSUES, **{field_name + '__in': values}).values_list(
+                    'pk', flat=True))
+        return issue_ids
+
+    @classmethod
+    def refresh_issues(cls,
+                       issue_ids: (Iterable[int], "Issues to refresh"),
+                       now: (datetime, "Time to compute ages at"),
+                       sla: (timedelta, "Maximum age of an issue within SLA")
+                       ) -> int:
+        """Replace entries of the issues, and update `IssueAgingCount`s.
+
+        Entries of solved and deleted issues are removed. Return number
+        of the issues.
+        """
+        issue_ids = iter(issue_ids)
+        refreshed = 0
+        while True:
+            batch = [issue_id for _, issue_id
+                     in zip(range(cls.BATCH_SIZE), issue_ids)]
+            if not batch:
+                return refreshed
+            refreshed += len(batch)
+            entries = cls.objects.filter(issue_id__in=batch)
+            deltas = {}
+            for entry in entries:
+                entry._add_to(deltas, -1)
+            entries.delete()
+            new_entries = [
+                cls.build(*values, now=now, sla=sla)
+                for values in Issue.objects.filter(
+                    cls.OPEN_ISSUES, pk__in=batch).values_list(
+                        'pk', 'project', 'category', 'status',
+                        'created_at')]
+            for entry in new_entries:
+                entry._add_to(deltas, 1)
+            cls.objects.bulk_create(new_entries)
+            for (project, category, status, bucket), \
+                    (count, breached_count) in deltas.items():
+                IssueAgingCount._add(project, category, status, bucket,
+                                     count, breached_count)
+
+    def _add_to(self, deltas, sign):
+        """Add the entry to changes of `IssueAgingCount`s with the sign."""
+        delta = deltas.setdefault(
+            (self.project, self.category, self.status, self.bucket), [0, 0])
+        delta[0] += sign
+        delta[1] += sign * int(self.breaches_sla)
+
+    def __str__(self):
+        """Return str representation of the instance."""
+        return "IssueAgingEntry of issue {}: {}".format(
+            self.issue_id, self.get_bucket_display())
+
+
+class IssueAgingCount(models.Model):
+    """Number of open issues of a category and status in an age bucket.
+
+    Issues are counted per project. See `IssueAgingReport`.
+    """
+
+    project = models.IntegerField(help_text="Primary key of `Project`.")
+    category = models.IntegerField(
+        null=True, help_text="Primary key of `IssueCategory`.")
+    status = models.IntegerField(
+        null=True, help_text="Primary key of `IssueStatus`.")
+    bucket = models.PositiveSmallIntegerField(
+        choices=list(enumerate(IssueAgingEntry.BUCKET_TITLES)))
+    count = models.IntegerField(default=0)
+    breached_count = models.IntegerField(
+        default=0, help_text="Number of the issues that breach SLA.")
+
+    class Meta:
+        """Meta attributes of `IssueAgingCount` model."""
+
+        unique_together = [('project', 'category', 'status', 'bucket')]
+
+    @classmethod
+    def _add(cls, project, category, status, bucket, count,
+             breached_count):
+        """Add given numbers to the count, creating it if needed."""
+        if not count and not breached_count:
+            return
+        counts = cls.objects.filter(project=project, category=category,
+                                    status=status, bucket=bucket)
+        changes = {'count': F('count') + count,
+                   'breached_count': F('breached_count') + breached_count}
+        if not counts.update(**changes):
+            cls.objects.get_or_create(project=project, category=category,
+                                      status=status, bucket=bucket)
+            counts.update(**changes)
+
+    @classmethod
+    def get_drifted_values(cls) -> Dict[str, Set[int]]:
+        """Return statuses and categories with a wrong number of issues.
+
+        The numbers are compared per project with open counts of
+        `IssueCounter`s. Return dict of `status` and `category` to sets
+        of primary keys.
+        """
+        drifted_values = {}
+        for field_name in ('status', 'category'):
+            expected = {
+                (project_id, value): open_count
+                for project_id, value, open_count
+                in IssueCounter.objects.filter(
+                    field_name=field_name, open_count__gt=0).values_list(
+                        'project', 'value', 'open_count')}
+            actual = {
+                (project_id, value): count
+                for project_id, value, count in cls.objects.filter(
+                    **{field_name + '__isnull': False}).order_by(
+                        ).values_list('project', field_name).annotate(
+                            Sum('count')).filter(count__sum__gt=0)}
+            drifted_values[field_name] = {
+                key[1] for key in expected.keys() | actual.keys()
+                if expected.get(key) != actual.get(key)}
+        return drifted_values
+
+    @classmethod
+    def recount(cls,
+                field_name: (str, "`status` or `category`"),
+                values: (Iterable[int], "Primary keys of statuses or"
+                         " categories to recount")):
+        """Replace counts of the values with ones computed from entries."""
+        cls.objects.filter(**{field_name + '__in': values}).delete()
+        cls.objects.bulk_create(
+            cls(**row)
+            for row in IssueAgingEntry.objects.filter(
+                **{field_name + '__in': values}).order_by().values(
+                    'project', 'category', 'status', 'bucket').annotate(
+                        count=Count('pk'),
+                        breached_count=Count(
+                            'pk', filter=Q(breaches_sla=True))))
+
+    @classmethod
+    def get_table(cls,
+                  project_id: (Union[int, None],
+                               "Only of the project, of all if None") = None
+                  ) -> Tuple[List[Tuple[Union[IssueCategory, None],
+                                        Union[IssueStatus, None],
+                                        List[int], int]],
+                             List[int], int]:
+        """Return the report as rows of a table, and totals.
+
+        Each row is a tuple of category, status, counts of issues per
+        bucket, and number of the issues that breach SLA. Rows are
+        ordered by category and status titles, those without category
+        or status last. Totals are counts per bucket and number of
+        issues that breach SLA.
+        """
+        counts = cls.objects.all()
+        if project_id is not None:
+            counts = counts.filter(project=project_id)
+        counts = [count for count in counts if count.count]
+        categories = IssueCategory.objects.in_bulk(
+            {count.category for count in counts} - {None})
+        statuses = IssueStatus.objects.in_bulk(
+            {count.status for count in counts} - {None})
+        rows = {}
+        totals = [0] * len(IssueAgingEntry.BUCKET_TITLES)
+        breached_total = 0
+        for count in counts:
+            row = rows.setdefault(
+                (count.category, count.status),
+                [categories.get(count.category), statuses.get(count.status),
+                 [0] * len(totals), 0])
+            row[2][count.bucket] += count.count
+            row[3] += count.breached_count
+            totals[count.bucket] += count.count
+            breached_total += count.breached_count
+        return (sorted((tuple(row) for row in rows.values()),
+                       key=lambda row: (row[0] is None,
+                                        row[0] and row[0].title,
+                                        row[1] is None,
+                                        row[1] and row[1].title)),
+                totals, breached_total)
+
+    def __str__(self):
+        """Return str representation of the instance."""
+        return "IssueAgingCount of project {}, category {}, status {}," \
+            " {}: {}".format(self.project, self.category, self.status,
+                             self.get_bucket_display(), self.count)
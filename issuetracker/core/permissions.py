@@ -0,0 +1,128 @@
+"""Caching of users' and groups' permissions between requests.
+
+Permissions are kept in the default cache under keys prefixed with a
+version shared by all processes. The version is replaced (after the
+transaction is committed) on any change of permissions of users and
+groups or of group membership, which invalidates the keys in every
+process at once.
+"""
+from uuid import uuid4
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_migrate, post_save)
+from django.dispatch import receiver
+
+
+VERSION_KEY = 'core:permissions:version'
+# Entries are not expected to become stale, but users and groups may be
+# deleted.
+TIMEOUT = 24 * 60 * 60
+
+
+def _get_version(user_obj: (User, "User to store the version on")) -> str:
+    """Return the current version of permission cache keys.
+
+    The version is fetched once per user object (i.e. per request).
+    """
+    if not hasattr(user_obj, '_permissions_version'):
+        cache.add(VERSION_KEY, uuid4().hex, None)
+        user_obj._permissions_version = cache.get(VERSION_KEY)
+    return user_obj._permissions_version
+
+
+def _get_key(user_obj: (User, "User whose permissions are checked"),
+             kind: (str, "`user` or `group`"),
+             pk: (int, "Primary key of the user or group")) -> str:
+    """Return versioned cache key of permissions of a user or group."""
+    return 'core:permissions:{}:{}:{}'.format(
+        _get_version(user_obj), kind, pk)
+
+
+def invalidate_permissions():
+    """Invalidate cached permissions in all processes.
+
+    Done on commit of the current transaction, so that other processes
+    don't cache permissions that are about to change.
+    """
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid4().hex, None))
+
+
+class CachedPermissionsBackend(ModelBackend):
+    """`ModelBackend` that caches permissions between requests.
+
+    Resolves permissions of a user with no queries after warm-up. The
+    cached entry of a group (such as `Staff`) is shared by all its
+    users. Superusers are not cached, as their permissions are not
+    checked by `User.has_perm`.
+    """
+
+    def _get_permissions(self, user_obj, obj, from_name):
+        """Return permissions of the user from `user` or `group`."""
+        if user_obj.is_superuser or not user_obj.is_active or \
+                user_obj.is_anonymous or obj is not None:
+            return super()._get_permissions(user_obj, obj, from_name)
+
+        perm_cache_name = '_%s_perm_cache' % from_name
+        if not hasattr(user_obj, perm_cache_name):
+            user_permissions, group_ids = self._get_cached_user(user_obj)
+            setattr(user_obj, perm_cache_name,
+                    user_permissions if from_name == 'user' else
+                    self._get_cached_groups_permissions(user_obj, group_ids))
+        return getattr(user_obj, perm_cache_name)
+
+    def _get_cached_user(self, user_obj):
+        """Return permissions of the user and primary keys of its groups."""
+        key = _get_key(user_obj, 'user', user_obj.pk)
+        entry = cache.get(key)
+        if entry is None:
+            entry = (
+                {"%s.%s" % (ct, name) for ct, name in
+                 self._get_user_permissions(user_obj).values_list(
+                     'content_type__app_label', 'codename').order_by()},
+                list(user_obj.groups.values_list('pk', flat=True)))
+            cache.set(key, entry, TIMEOUT)
+        return entry
+
+    def _get_cached_groups_permissions(self, user_obj, group_ids):
+        """Return union of permissions of the groups."""
+        keys = {_get_key(user_obj, 'group', pk): pk for pk in group_ids}
+        entries = cache.get_many(keys)
+        missing_ids = [pk for key, pk in keys.items() if key not in entries]
+        if missing_ids:
+            missing_entries = {_get_key(user_obj, 'group', pk): set()
+                               for pk in missing_ids}
+            for pk, ct, name in Permission.objects.filter(
+                    group__in=missing_ids).values_list(
+                        'group', 'content_type__app_label',
+                        'codename').order_by():
+                missing_entries[_get_key(user_obj, 'group', pk)].add(
+                    "%s.%s" % (ct, name))
+            cache.set_many(missing_entries, TIMEOUT)
+            entries.update(missing_entries)
+        return set().union(*entries.values())
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def _invalidate_on_m2m_change(sender, action, **kwargs):
+    """Invalidate cached permissions on membership or grant change."""
+    if action.startswith('post_'):
+        invalidate_permissions()
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+@receiver(post_delete, sender=Group)
+@receiver(post_migrate)
+def _invalidate_on_change(sender, **kwargs):
+    """Invalidate cached permissions on change of the model.
+
+    Also on migration, as data migrations (like the one that creates
+    `Staff` group) don't send signals with the models above.
+    """
+    invalidate_permissions()
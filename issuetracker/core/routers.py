@@ -0,0 +1,66 @@
+"""DB router that places data of projects on their DBs."""
+from django.db import DEFAULT_DB_ALIAS
+
+from .middleware import get_current_project
+
+
+def _is_project_data(model):
+    """Return True if the model (or the instance) is owned by projects.
+
+    Those are all models of `core` app, except `Project` itself.
+    """
+    return model._meta.app_label == 'core' and \
+        model._meta.model_name != 'project'
+
+
+class ProjectRouter():
+    """Router of data owned by projects to DBs of the projects.
+
+    `Project`s, users and data of other apps are stored in the default
+    DB. Data of a project is stored in its `database`: an instance is
+    written to DB of its project, or of the project it is related to,
+    and queries are made to DB of the current project (see
+    `core.middleware.get_current_project`), or the default one. DBs
+    other than the default one only have tables of the models owned by
+    projects, and data migrations are not applied to them.
+
+    Aggregates over issues (counters, the aging report and analytics)
+    are kept per DB, while the feed of updates only covers projects of
+    the default DB.
+    """
+
+    def _get_db(self, model, **hints):
+        """Return DB of the data, or None for the default one."""
+        if not _is_project_data(model):
+            # Otherwise DB of the related instance is used for relations.
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None:
+            if not _is_project_data(instance):
+                return getattr(instance, 'database', None)
+            if instance._state.db:
+                return instance._state.db
+            if getattr(instance, 'project_id', None) is not None:
+                return instance.project.database
+        project = get_current_project()
+        return project.database if project is not None else None
+
+    def db_for_read(self, model, **hints):
+        """Return DB to read instances of the model from."""
+        return self._get_db(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        """Return DB to write instances of the model to."""
+        return self._get_db(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations within a DB, and to projects and users."""
+        if _is_project_data(obj1) and _is_project_data(obj2):
+            return obj1._state.db == obj2._state.db
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Allow only models owned by projects on non-default DBs."""
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        return app_label == 'core' and model_name not in (None, 'project')
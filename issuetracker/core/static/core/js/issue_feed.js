@@ -0,0 +1,24 @@
+/* Notify about issue updates on the issue change list, instead of the
+ * page being reloaded to check for them. */
+(function($) {
+    'use strict';
+
+    $(document).ready(function() {
+        var $container = $('.issues-feed');
+        if (!window.EventSource || !$container.length) {
+            return;
+        }
+        var issues = {};
+        var source = new EventSource($container.data('url'));
+
+        source.addEventListener('issue_update', function(event) {
+            var update = JSON.parse(event.data);
+            issues[update.issue] = true;
+            var count = Object.keys(issues).length;
+            $container.find('.content').text(
+                count + (count === 1 ? ' issue was' : ' issues were') +
+                ' updated since the page was loaded.');
+            $container.prop('hidden', false);
+        });
+    });
+})(django.jQuery);
@@ -0,0 +1,27 @@
+/* Load the issue history on the issue change form page by page, on
+ * demand. */
+(function($) {
+    'use strict';
+
+    $(document).ready(function() {
+        var $container = $('.issue-updates');
+        var $content = $container.find('.content');
+        var $loadMore = $container.find('.load-more');
+        var url = $container.data('url');
+
+        $loadMore.on('click', function(event) {
+            event.preventDefault();
+            $loadMore.hide();
+            $.get(url).done(function(html) {
+                $content.append(html);
+                var $nextPage = $content.find('.next-page').remove();
+                if ($nextPage.length) {
+                    url = $nextPage.data('url');
+                    $loadMore.text('Load more').show();
+                }
+            }).fail(function() {
+                $loadMore.show();
+            });
+        });
+    });
+})(django.jQuery);
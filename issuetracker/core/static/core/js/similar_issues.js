@@ -0,0 +1,43 @@
+/* Show likely duplicates of an issue while its title and description
+ * are being typed on the issue add form. */
+(function($) {
+    'use strict';
+    var DELAY = 300;
+
+    $(document).ready(function() {
+        var $container = $('.similar-issues');
+        var $list = $container.find('.content');
+        var $inputs = $('#id_title, #id_description');
+        var timeout = null;
+        var request = null;
+
+        function render(issues) {
+            $list.empty();
+            $.each(issues, function(i, issue) {
+                $('<li>').append(
+                    $('<a target="_blank">').attr('href', issue.url)
+                        .text(issue.title),
+                    ' (' + Math.round(issue.similarity * 100) + '%)'
+                ).appendTo($list);
+            });
+            $container.prop('hidden', !issues.length);
+        }
+
+        function update() {
+            if (request) {
+                request.abort();
+            }
+            request = $.getJSON($container.data('url'), {
+                title: $('#id_title').val(),
+                description: $('#id_description').val()
+            }).done(function(data) {
+                render(data.issues);
+            });
+        }
+
+        $inputs.on('input', function() {
+            clearTimeout(timeout);
+            timeout = setTimeout(update, DELAY);
+        });
+    });
+})(django.jQuery);
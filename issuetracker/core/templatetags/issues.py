@@ -0,0 +1,31 @@
+"""Template tags for `core` app."""
+from typing import List, Tuple
+
+from django import template
+
+from ..middleware import get_current_project
+from ..models import IssueCounter, Project
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def get_open_issue_count(field_name: (str, "Field name of `IssueCounter`"),
+                         value: (int, "Value of the field")) -> int:
+    """Return number of open issues with the value of the field.
+
+    Only issues of the current project are counted.
+    """
+    counter = IssueCounter.get_counts(
+        field_name, [value], get_current_project()).get(value)
+    return counter.open_count if counter else 0
+
+
+@register.simple_tag
+def get_projects() -> List[Tuple[Project, bool]]:
+    """Return all projects, each with True if it is the current one."""
+    current_project = get_current_project()
+    return [(project, current_project is not None
+             and project.pk == current_project.pk)
+            for project in Project.objects.order_by('title')]
@@ -3,12 +3,37 @@
 Many tests are not implemented to save time, those implemented and the
 names of those not implemented are enough for demonstration.
 """
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from datetime import timedelta
+from unittest import mock
 
-from django.test import TestCase
-from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.contrib import admin
+from django.contrib.admin.templatetags.admin_list import results
+from django.contrib.auth.models import User, Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.middleware import SessionMiddleware
 
-from .models import Issue, IssueStatus, IssueCategory
+from . import analytics, feed
+from .admin import IssueAdminForm
+from .middleware import (
+    current_project_storage, get_current_project, select_project,
+    use_project)
+from .models import (
+    Project, Issue, IssueStatus, IssueCategory, IssueUpdate, IssueCounter,
+    IssueVersionConflict, IssueAgingReport, IssueAgingCount)
 
 
 class IssueTestMixin():
@@ -50,6 +75,19 @@ class IssueTestCase(IssueTestMixin, TestCase):
         self.issue.solver.delete()
         self.assertTrue(Issue.objects.filter(pk=self.issue.pk).exists())
 
+    def test_solved_at_kept_when_status_deferred(self):
+        """Test `solved_at` isn't reset if status wasn't loaded."""
+        self.issue.status = IssueStatus.objects.create(title="Solved",
+                                                       is_solved=True)
+        self.issue.save()
+        solved_at = self.issue.solved_at
+        issue = Issue.objects.only('title', 'solved_at').get(
+            pk=self.issue.pk)
+        issue.title = "Changed test issue title"
+        issue.save()
+        self.assertEqual(Issue.objects.get(pk=self.issue.pk).solved_at,
+                         solved_at)
+
 
 class IssueUpdateTestCase(IssueTestMixin, TestCase):
     """Tests for `IssueUpdate` model.
@@ -119,6 +157,829 @@ class IssueUpdateTestCase(IssueTestMixin, TestCase):
                          old_issue_updates_count)
 
 
+class IssueVersionTestCase(IssueTestMixin, TestCase):
+    """Tests for optimistic concurrency control of `Issue`."""
+
+    def test_version_incremented_on_update(self):
+        """Test `version` is incremented in DB and on the instance."""
+        self.issue.title = "Test another issue title"
+        self.issue.save()
+        self.assertEqual(self.issue.version, 1)
+        self.assertEqual(Issue.objects.get(pk=self.issue.pk).version, 1)
+
+    def test_stale_instance_save_raises_conflict(self):
+        """Test saving an instance loaded before another update fails."""
+        stale_issue = Issue.objects.get(pk=self.issue.pk)
+        self.issue.title = "Test another issue title"
+        self.issue.save()
+
+        old_issue_updates_count = self.issue.issue_updates.count()
+        stale_issue.title = "Test stale issue title"
+        with self.assertRaises(IssueVersionConflict):
+            stale_issue.save()
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.title, "Test another issue title")
+        self.assertEqual(self.issue.issue_updates.count(),
+                         old_issue_updates_count)
+
+    def test_update_with_retries_reapplies_modification(self):
+        """Test `update_with_retries` retries after a conflict."""
+        def modify(issue):
+            if not calls:
+                # Concurrent update after the issue has been loaded.
+                concurrent_issue = Issue.objects.get(pk=issue.pk)
+                concurrent_issue.description = "Concurrent description"
+                concurrent_issue.save()
+            calls.append(issue)
+            issue.title = "Test another issue title"
+
+        calls = []
+        issue = Issue.update_with_retries(self.issue.pk, modify)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(issue.version, 2)
+        issue.refresh_from_db()
+        self.assertEqual(issue.title, "Test another issue title")
+        self.assertEqual(issue.description, "Concurrent description")
+
+    def test_admin_form_rejects_stale_version(self):
+        """Test `IssueAdminForm` with an outdated `version` is invalid."""
+        self.issue.save()
+        form = IssueAdminForm(
+            data={'title': self.issue.title,
+                  'description': self.issue.description,
+                  'status': self.issue.status.pk,
+                  'category': self.issue.category.pk,
+                  'version': self.issue.version - 1},
+            instance=Issue.objects.get(pk=self.issue.pk))
+        self.assertFalse(form.is_valid())
+        self.assertIn("modified by someone else", str(form.non_field_errors()))
+
+
+class IssueFindSimilarTestCase(IssueTestMixin, TestCase):
+    """Tests for near-duplicate lookup of `Issue`s."""
+
+    def test_near_duplicate_found(self):
+        """Test an issue with slightly different text is found."""
+        Issue.objects.create(title="Unrelated issue",
+                             description="Nothing in common with others")
+        similar_issues = Issue.find_similar(
+            "Test issue title", "Test issue description, again")
+        self.assertEqual([issue for issue, _ in similar_issues],
+                         [self.issue])
+
+    def test_exclude_pk(self):
+        """Test the issue itself is not returned with `exclude_pk`."""
+        self.assertEqual(
+            Issue.find_similar(self.issue.title, self.issue.description,
+                               exclude_pk=self.issue.pk),
+            [])
+
+    def test_similarity_bands_updated_on_save(self):
+        """Test the issue is found by its new texts after update."""
+        self.issue.title = "Completely different title"
+        self.issue.description = "Completely different description"
+        self.issue.save()
+        self.assertEqual(
+            Issue.find_similar("Test issue title", "Test issue description"),
+            [])
+        self.assertEqual(
+            Issue.find_similar(self.issue.title, self.issue.description),
+            [(self.issue, 1.0)])
+
+    def test_similarity_bands_kept_if_texts_unchanged(self):
+        """Test bands are not rewritten on save of other fields."""
+        band_ids = set(self.issue.similarity_bands.values_list(
+            'pk', flat=True))
+        issue = Issue.objects.get(pk=self.issue.pk)
+        issue.category = None
+        issue.save()
+        self.assertEqual(set(issue.similarity_bands.values_list(
+            'pk', flat=True)), band_ids)
+
+
+class IssueUpdateHistoryTestCase(IssueTestMixin, TestCase):
+    """Tests for pages of `Issue` history built from `IssueUpdate`s."""
+
+    def test_changes_between_updates(self):
+        """Test changes are relative to the previous update."""
+        self.issue.title = "Test another issue title"
+        self.issue.status = IssueStatus.objects.create(title="Assigned",
+                                                       is_solved=False)
+        self.issue.save()
+
+        page, next_before = IssueUpdate.get_history_page(self.issue.pk)
+        self.assertIsNone(next_before)
+        self.assertEqual(len(page), 2)
+        self.assertEqual(page[0][1], [
+            {'field': 'title', 'old': "Test issue title",
+             'new': "Test another issue title"},
+            {'field': 'status', 'old': "New", 'new': "Assigned"}])
+
+    def test_description_change_is_diff(self):
+        """Test change of `description` is presented as a diff."""
+        self.issue.description = "Test another issue description"
+        self.issue.save()
+
+        page, _ = IssueUpdate.get_history_page(self.issue.pk)
+        self.assertEqual(page[0][1], [
+            {'field': 'description',
+             'diff': ["@@ -1 +1 @@", "-Test issue description",
+                      "+Test another issue description"]}])
+
+    def test_pages_fetched_with_single_query_each(self):
+        """Test pagination, one query per page including related names."""
+        for i in range(4):
+            self.issue.title = "Test issue title {}".format(i)
+            self.issue.save()
+
+        with self.assertNumQueries(1):
+            page, next_before = IssueUpdate.get_history_page(
+                self.issue.pk, page_size=3)
+        self.assertEqual(len(page), 3)
+        self.assertEqual(page[-1][1][0]['new'], "Test issue title 1")
+
+        with self.assertNumQueries(1):
+            page, next_before = IssueUpdate.get_history_page(
+                self.issue.pk, next_before, page_size=3)
+        self.assertEqual(len(page), 2)
+        self.assertIsNone(next_before)
+
+    def test_pages_ordered_by_time_of_update(self):
+        """Test an update committed after a later one is paged in order."""
+        for title in ("Test another issue title", "Test issue title"):
+            self.issue.title = title
+            self.issue.save()
+        first, second, late = IssueUpdate.objects.filter(
+            issue=self.issue).order_by('pk')
+        IssueUpdate.objects.filter(pk=late.pk).update(
+            updated_at=first.updated_at + timedelta(microseconds=1))
+
+        update_ids = []
+        next_before = None
+        while True:
+            page, next_before = IssueUpdate.get_history_page(
+                self.issue.pk, next_before, page_size=1)
+            update_ids.extend(update.pk for update, _ in page)
+            if next_before is None:
+                break
+        self.assertEqual(update_ids, [second.pk, late.pk, first.pk])
+
+
+class IssueCounterTestCase(IssueTestMixin, TestCase):
+    """Tests for denormalized counts of `Issue`s in `IssueCounter`s."""
+
+    def assert_counts(self, field_name, value, total_count, open_count):
+        """Assert the counter of the value of the field has the counts."""
+        counter = IssueCounter.get_counts(field_name, [value])[value]
+        self.assertEqual((counter.total_count, counter.open_count),
+                         (total_count, open_count))
+
+    def test_issue_counted_on_create_and_update(self):
+        """Test counters follow changes of issue status and category."""
+        self.assert_counts('status', self.issue.status.pk, 1, 1)
+        self.assert_counts('category', self.issue.category.pk, 1, 1)
+        self.assert_counts('solver', self.issue.solver.pk, 1, 1)
+
+        old_status = self.issue.status
+        self.issue.status = IssueStatus.objects.create(title="Solved",
+                                                       is_solved=True)
+        self.issue.save()
+        self.assert_counts('status', old_status.pk, 0, 0)
+        self.assert_counts('status', self.issue.status.pk, 1, 0)
+        self.assert_counts('category', self.issue.category.pk, 1, 0)
+        self.assertEqual(IssueCounter.get_drift(), {})
+
+    def test_issuestatus_is_solved_change(self):
+        """Test open counts are updated when status becomes solved."""
+        self.issue.status.is_solved = True
+        self.issue.status.save()
+        self.assert_counts('status', self.issue.status.pk, 1, 0)
+        self.assert_counts('category', self.issue.category.pk, 1, 0)
+        self.assertEqual(IssueCounter.get_drift(), {})
+
+    def test_solved_issuestatus_deletion(self):
+        """Test issues of a deleted solved status are counted as open."""
+        self.issue.status.is_solved = True
+        self.issue.status.save()
+        self.issue.status.delete()
+        self.assertEqual(IssueCounter.get_counts('status'), {})
+        self.assert_counts('category', self.issue.category.pk, 1, 1)
+        self.assertEqual(IssueCounter.get_drift(), {})
+
+    def test_issues_counted_per_project(self):
+        """Test issues of another project on the same DB are apart."""
+        project = Project.objects.create(title="Other")
+        with use_project(project):
+            Issue.objects.create(title="Other project issue",
+                                 solver=self.issue.solver)
+        counts = IssueCounter.get_counts('solver', project=project)
+        self.assertEqual(counts[self.issue.solver.pk].open_count, 1)
+        counts = IssueCounter.get_counts('solver')
+        self.assertEqual(counts[self.issue.solver.pk].open_count, 2)
+        self.assertEqual(IssueCounter.get_drift(), {})
+
+    def test_drift_repaired(self):
+        """Test changes bypassing `Issue.save` are detected and repaired."""
+        Issue.objects.filter(pk=self.issue.pk).update(category=None)
+        self.assertEqual(IssueCounter.get_drift(), {
+            ('category', self.issue.project_id, self.issue.category.pk):
+            ((1, 1), (0, 0))})
+        IssueCounter.repair()
+        self.assertEqual(IssueCounter.get_drift(), {})
+        self.assertEqual(IssueCounter.get_counts('category'), {})
+
+
+class IssueChangeListTestCase(TestCase):
+    """Tests for query budget of `Issue` admin change list."""
+
+    def setUp(self):
+        """Set up a full page of issues and a superuser request."""
+        user = User.objects.create_superuser(
+            username='admin0', email='admin0@example.com', password='admin0')
+        status = IssueStatus.objects.create(title="New", is_solved=False)
+        category = IssueCategory.objects.create(title="Other")
+        for i in range(101):
+            Issue.objects.create(
+                title="Test issue title {}".format(i),
+                description="Test issue description",
+                status=status, category=category, solver=user)
+        self.request = RequestFactory().get('/core/issue/')
+        self.request.user = user
+
+    def test_page_rendered_with_fixed_number_of_queries(self):
+        """Test 100 rows are loaded and rendered with 9 queries.
+
+        Two counts of all issues, two queries per each of 3 list
+        filters (choices and their `IssueCounter`s), and one query of
+        the page.
+        """
+        model_admin = admin.site._registry[Issue]
+        with CaptureQueriesContext(connection) as context:
+            changelist = model_admin.get_changelist_instance(self.request)
+            changelist.formset = None
+            rows = [list(row) for row in results(changelist)]
+        self.assertEqual(len(rows), 100)
+        self.assertEqual(len(context), 9)
+        self.assertNotIn('description', context.captured_queries[-1]['sql'])
+
+    def test_open_filter_matches_open_count(self):
+        """Test open issues filter lists issues counted as open."""
+        issue = Issue.objects.first()
+        issue.status = IssueStatus.objects.create(title="Solved",
+                                                  is_solved=True)
+        issue.save()
+        model_admin = admin.site._registry[Issue]
+        request = RequestFactory().get('/core/issue/', {
+            'solver__id__exact': self.request.user.pk, 'is_open': '1'})
+        request.user = self.request.user
+        changelist = model_admin.get_changelist_instance(request)
+        self.assertEqual(changelist.result_count, IssueCounter.get_counts(
+            'solver')[self.request.user.pk].open_count)
+        self.assertEqual(changelist.result_count, 100)
+
+
+class IssueAgingReportTestCase(IssueTestMixin, TestCase):
+    """Tests for the materialized issue aging report."""
+
+    def setUp(self):
+        """Set up environment, with the issue created 3 days ago."""
+        super().setUp()
+        self.now = timezone.now()
+        Issue.objects.filter(pk=self.issue.pk).update(
+            created_at=self.now - timedelta(days=3))
+        IssueAgingReport.refresh(now=self.now)
+
+    def get_counts(self):
+        """Return non-zero counts as dict of their keys to numbers."""
+        return {(count.category, count.status, count.bucket):
+                (count.count, count.breached_count)
+                for count in IssueAgingCount.objects.all() if count.count}
+
+    def test_rebuild_buckets_open_issues(self):
+        """Test the issue is counted in 1-7 days bucket within SLA."""
+        self.assertEqual(self.get_counts(), {
+            (self.issue.category.pk, self.issue.status.pk, 1): (1, 0)})
+
+    def test_rollover_refreshes_only_crossing_issues(self):
+        """Test an issue crossing a boundary moves to the next bucket."""
+        self.assertEqual(
+            IssueAgingReport.refresh(now=self.now + timedelta(days=1)), 0)
+        self.assertEqual(
+            IssueAgingReport.refresh(now=self.now + timedelta(days=5)), 1)
+        self.assertEqual(self.get_counts(), {
+            (self.issue.category.pk, self.issue.status.pk, 2): (1, 1)})
+        self.assertTrue(self.issue.aging_entry.breaches_sla)
+
+    def test_changed_issue_refreshed(self):
+        """Test a solved issue and a new issue are refreshed."""
+        self.issue.status = IssueStatus.objects.create(title="Solved",
+                                                       is_solved=True)
+        self.issue.save()
+        Issue.objects.create(title="Another issue")
+        self.assertEqual(IssueAgingReport.refresh(now=self.now), 2)
+        self.assertEqual(self.get_counts(), {(None, None, 0): (1, 0)})
+
+    def test_issuestatus_becoming_solved_refreshes_its_issues(self):
+        """Test issues of a status that became solved are removed."""
+        self.issue.status.is_solved = True
+        self.issue.status.save()
+        IssueAgingReport.refresh(now=self.now)
+        self.assertEqual(self.get_counts(), {})
+        self.issue.status.is_solved = False
+        self.issue.status.save()
+        IssueAgingReport.refresh(now=self.now)
+        self.assertEqual(self.get_counts(), {
+            (self.issue.category.pk, self.issue.status.pk, 1): (1, 0)})
+
+    def test_issuecategory_deletion_refreshes_its_issues(self):
+        """Test issues of a deleted category are moved to no category."""
+        self.issue.category.delete()
+        IssueAgingReport.refresh(now=self.now)
+        self.assertEqual(self.get_counts(), {
+            (None, self.issue.status.pk, 1): (1, 0)})
+
+    def test_issues_counted_per_project(self):
+        """Test issues of another project on the same DB are apart."""
+        project = Project.objects.create(title="Other")
+        with use_project(project):
+            Issue.objects.create(title="Other project issue")
+        IssueAgingReport.refresh(now=self.now)
+        self.assertEqual(
+            IssueAgingCount.get_table(self.issue.project_id)[1],
+            [0, 1, 0, 0])
+        self.assertEqual(IssueAgingCount.get_table(project.pk)[1],
+                         [1, 0, 0, 0])
+        self.assertEqual(IssueAgingCount.get_table()[1], [1, 1, 0, 0])
+
+
+class AnalyticsSnapshotTestCase(IssueTestMixin, TestCase):
+    """Tests for solution time analytics over `analytics.Snapshot`."""
+
+    def setUp(self):
+        """Set up environment, with the issue solved in 2 hours."""
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.created_at = timezone.now() - timedelta(days=10)
+        Issue.objects.filter(pk=self.issue.pk).update(
+            created_at=self.created_at,
+            solved_at=self.created_at + timedelta(hours=2))
+
+    def test_reports(self):
+        """Test reports over a built snapshot."""
+        snapshot, fetched = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual(fetched, 1)
+        self.assertEqual([count for _, _, count in snapshot.get_histogram()],
+                         [0, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(snapshot.get_solver_throughput(),
+                         [(self.issue.solver.pk, 1, 2.0, 2.0)])
+        (_, count, mean, median), = snapshot.get_trend()
+        self.assertEqual((count, mean, median), (1, 2.0, 2.0))
+        (_, count, solved_within), = snapshot.get_cohorts()
+        self.assertEqual((count, solved_within), (1, [1, 1, 1]))
+        self.assertEqual(
+            snapshot.get_histogram(category_id=self.issue.category.pk + 1)[1],
+            (1, 4, 0))
+
+    def test_incremental_refresh(self):
+        """Test updated and new issues are merged into the snapshot."""
+        analytics.Snapshot.refresh(self.directory)
+        self.issue.refresh_from_db()
+        self.issue.solved_at = self.created_at + timedelta(days=2)
+        self.issue.save()
+        Issue.objects.create(title="Another issue")
+        snapshot, fetched = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual(fetched, 2)
+        self.assertEqual(snapshot.get_count(), 2)
+        self.assertEqual([count for _, _, count in snapshot.get_histogram()],
+                         [0, 0, 0, 1, 0, 0, 0])
+        self.assertEqual(
+            analytics.Snapshot.load(self.directory).get_count(), 2)
+
+    def test_rebuilt_if_issues_missed(self):
+        """Test deleted and late committed issues cause a rebuild."""
+        analytics.Snapshot.refresh(self.directory)
+        late_issue = Issue.objects.create(title="Another issue")
+        Issue.objects.create(title="Yet another issue")
+        # Imitate commit of the issue long after it was saved.
+        Issue.objects.filter(pk=late_issue.pk).update(
+            updated_at=self.created_at)
+        snapshot, fetched = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual((fetched, snapshot.get_count()), (3, 3))
+        self.issue.delete()
+        snapshot, fetched = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual((fetched, snapshot.get_count()), (2, 2))
+
+    def test_rebuilt_after_interval(self):
+        """Test an old snapshot is rebuilt from all issues."""
+        Issue.objects.filter(pk=self.issue.pk).update(
+            updated_at=self.created_at - timedelta(days=1))
+        issue = Issue.objects.create(title="Another issue")
+        Issue.objects.filter(pk=issue.pk).update(updated_at=self.created_at)
+        analytics.Snapshot.refresh(self.directory)
+        _, fetched = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual(fetched, 1)
+        with mock.patch.object(analytics, 'REBUILD_INTERVAL', timedelta()):
+            _, fetched = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual(fetched, 2)
+
+    def test_reports_of_project(self):
+        """Test reports only cover issues of the given project."""
+        project = Project.objects.create(title="Other")
+        with use_project(project):
+            Issue.objects.create(title="Other project issue")
+        snapshot, _ = analytics.Snapshot.refresh(self.directory)
+        self.assertEqual(snapshot.get_count(project_id=project.pk), 1)
+        self.assertEqual(
+            snapshot.get_cohorts(project_id=self.issue.project_id)[0][1], 1)
+        self.assertEqual(snapshot.get_histogram(project_id=project.pk)[1],
+                         (1, 4, 0))
+
+
+class CachedPermissionsBackendTestCase(TransactionTestCase):
+    """Tests for caching of permissions between requests."""
+
+    def setUp(self):
+        """Set up a user of a group with a permission."""
+        cache.clear()
+        self.permission = Permission.objects.get(
+            content_type=ContentType.objects.get_for_model(Issue),
+            codename='view_issue')
+        self.group = Group.objects.create(name="Test staff")
+        self.group.permissions.add(self.permission)
+        self.user = User.objects.create_user(
+            username='staff0', email='staff0@example.com', is_staff=True)
+        self.user.groups.add(self.group)
+
+    def get_user(self):
+        """Return a new instance of the user, like in a new request."""
+        return User.objects.get(pk=self.user.pk)
+
+    def test_permissions_resolved_without_queries_after_warm_up(self):
+        """Test permissions are taken from the cache in a new request."""
+        self.assertTrue(self.get_user().has_perm('core.view_issue'))
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm('core.view_issue'))
+            self.assertFalse(user.has_perm('core.change_issue'))
+
+    def test_group_permission_removal_invalidates_cache(self):
+        """Test removed group permission is not taken from the cache."""
+        self.assertTrue(self.get_user().has_perm('core.view_issue'))
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.get_user().has_perm('core.view_issue'))
+
+    def test_group_membership_removal_invalidates_cache(self):
+        """Test permissions of a left group are not taken from the cache."""
+        self.assertTrue(self.get_user().has_perm('core.view_issue'))
+        self.user.groups.remove(self.group)
+        self.assertFalse(self.get_user().has_perm('core.view_issue'))
+
+
+class IssueFeedTestCase(TransactionTestCase):
+    """Tests for the push-based feed of `IssueUpdate`s."""
+
+    def test_existing_updates_yielded_immediately(self):
+        """Test updates after the given one are yielded without waiting."""
+        last_id = feed.get_last_id()
+        issue = Issue.objects.create(title="Test issue title")
+        updates = next(feed.iter_updates(last_id, 0))
+        self.assertEqual([update['issue_id'] for update in updates],
+                         [issue.pk])
+
+    def test_update_committed_late_yielded(self):
+        """Test an update is yielded after greater ones were yielded."""
+        last_id = feed.get_last_id()
+        issue = Issue.objects.create(title="Test issue title")
+        issue.title = "Changed test issue title"
+        issue.save()
+        late_update, update = IssueUpdate.objects.filter(
+            issue=issue).order_by('pk')
+        # Imitate commit of the first update after the second one.
+        IssueUpdate.objects.filter(pk=late_update.pk).delete()
+        updates = feed.iter_updates(last_id, feed.WAIT_TIMEOUT)
+        self.assertEqual([fed['pk'] for fed in next(updates)],
+                         [update.pk])
+        late_update.save(force_insert=True)
+        self.assertEqual([fed['pk'] for fed in next(updates)],
+                         [late_update.pk])
+
+    def test_updates_of_project_yielded(self):
+        """Test only updates of the given project are yielded."""
+        last_id = feed.get_last_id()
+        issue = Issue.objects.create(title="Test issue title")
+        project = Project.objects.create(title="Other")
+        with use_project(project):
+            Issue.objects.create(title="Other project issue title")
+        self.assertLess(feed.get_last_id(issue.project_id), feed.get_last_id())
+        subscriber = feed.iter_updates(last_id, feed.WAIT_TIMEOUT,
+                                       issue.project_id)
+        self.assertEqual([update['issue_id'] for update in next(subscriber)],
+                         [issue.pk])
+        with use_project(project):
+            Issue.objects.create(title="Another other project issue title")
+        another_issue = Issue.objects.create(title="Another test issue title")
+        self.assertEqual([update['issue_id'] for update in next(subscriber)],
+                         [another_issue.pk])
+
+    def test_subscribers_share_fetched_updates(self):
+        """Test a new update is fetched from DB once for all subscribers."""
+        last_id = feed.get_last_id()
+        Issue.objects.create(title="Test issue title")
+        subscribers = [feed.iter_updates(last_id, feed.WAIT_TIMEOUT)
+                       for _ in range(3)]
+        for subscriber in subscribers:
+            next(subscriber)
+        issue = Issue.objects.create(title="Another test issue title")
+        with self.assertNumQueries(1):
+            for subscriber in subscribers:
+                self.assertEqual(
+                    [update['issue_id'] for update in next(subscriber)],
+                    [issue.pk])
+
+    def test_update_committed_after_window_missed(self):
+        """Test an update committed too late is not yielded.
+
+        It is a known limit of the feed, see `feed.REFEED_WINDOW`.
+        """
+        last_id = feed.get_last_id()
+        issue = Issue.objects.create(title="Test issue title")
+        for title in ("Changed test issue title", "Test issue title"):
+            issue.title = title
+            issue.save()
+        late_update, *updates = IssueUpdate.objects.filter(
+            issue=issue).order_by('pk')
+        IssueUpdate.objects.filter(pk=late_update.pk).delete()
+        with mock.patch.object(feed, 'REFEED_WINDOW', 1):
+            subscriber = feed.iter_updates(last_id, 0.2)
+            self.assertEqual([fed['pk'] for fed in next(subscriber)],
+                             [update.pk for update in updates])
+            late_update.save(force_insert=True)
+            self.assertEqual(list(subscriber), [])
+
+    def test_waiting_subscriber_woken_by_new_update(self):
+        """Test a subscriber gets an update created while it waits."""
+        last_id = feed.get_last_id()
+
+        def create_issue():
+            Issue.objects.create(title="Test issue title")
+            connection.close()
+
+        # Test DB is shared in-memory SQLite, where reading a table that
+        # is being written by another connection fails instead of waiting.
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA read_uncommitted = 1')
+        timer = threading.Timer(0.1, create_issue)
+        timer.start()
+        started_at = time.monotonic()
+        updates = next(feed.iter_updates(last_id, feed.WAIT_TIMEOUT))
+        timer.join()
+        self.assertLess(time.monotonic() - started_at, feed.WAIT_TIMEOUT)
+        self.assertEqual([update['title'] for update in updates],
+                         ["Test issue title"])
+
+
+class ServiceEndpointsTestCase(TestCase):
+    """Tests for health, readiness and metrics endpoints."""
+
+    def test_healthz_makes_no_queries(self):
+        """Test `/healthz` doesn't touch sessions or other DB tables."""
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Set-Cookie', response)
+
+    def test_readyz_reports_reachable_db(self):
+        """Test `/readyz` succeeds when DB is reachable."""
+        self.assertEqual(self.client.get('/readyz').status_code, 200)
+
+    def test_metrics_count_issue_saves(self):
+        """Test `/metrics` reflects saved issues."""
+        def get_saves():
+            for line in self.client.get('/metrics').content.decode(
+                    ).splitlines():
+                if line.startswith(
+                        'issuetracker_issue_saves_total{created="true"}'):
+                    return float(line.split()[-1])
+            return 0
+
+        saves = get_saves()
+        Issue.objects.create(title="Test issue title")
+        self.assertEqual(get_saves(), saves + 1)
+
+
+class StartupTestCase(unittest.TestCase):
+    """Benchmark of Django setup time, including imports of all apps.
+
+    Setup is measured in fresh interpreters, taking the best of several
+    runs to reduce noise, and compared with time of a baseline measured
+    the same way, so that budgets don't depend on speed of the machine.
+    """
+
+    # Code which time is the baseline: imports of Django modules any
+    # setup needs.
+    baseline_code = 'import django.db.models, django.forms, django.template'
+    # Maximum setup time per settings module, relative to the baseline,
+    # about 1.5 times the ratio measured on a developer's machine.
+    budgets = {
+        'issuetracker.settings': 4.0,
+        'issuetracker.settings_lean': 3.0,
+    }
+    runs = 3
+    # Modules that must not be imported by commands run with lean
+    # settings.
+    lean_excluded_modules = ('django.contrib.admin', 'admin_view_permission',
+                             'core.admin', 'prometheus_client', 'numpy')
+
+    def run_setup(self, settings_module, code,
+                  setup_code='import django\ndjango.setup()'):
+        """Return output of the code run after Django setup.
+
+        `setup_time` variable is the time of the setup code.
+        """
+        return subprocess.run(
+            [sys.executable, '-c',
+             'import time\n'
+             'started_at = time.perf_counter()\n' + setup_code + '\n'
+             'setup_time = time.perf_counter() - started_at\n' + code,
+             # Not `test`, to get settings of a deployment.
+             'startup'],
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module),
+            cwd=settings.BASE_DIR, stdout=subprocess.PIPE, check=True,
+            universal_newlines=True).stdout
+
+    def get_setup_time(self, settings_module, **kwargs):
+        """Return the best time of setup in fresh interpreters."""
+        return min(float(self.run_setup(settings_module, 'print(setup_time)',
+                                        **kwargs))
+                   for _ in range(self.runs))
+
+    def test_setup_time_within_budget(self):
+        """Test setup with each settings module fits its budget."""
+        baseline = self.get_setup_time('issuetracker.settings',
+                                       setup_code=self.baseline_code)
+        for settings_module, budget in self.budgets.items():
+            with self.subTest(settings_module=settings_module):
+                self.assertLess(
+                    self.get_setup_time(settings_module) / baseline, budget)
+
+    def test_lean_settings_skip_http_modules(self):
+        """Test lean settings don't import modules needed only for HTTP."""
+        modules = self.run_setup(
+            'issuetracker.settings_lean',
+            'import sys\nprint("\\n".join(sys.modules))').splitlines()
+        for module in self.lean_excluded_modules:
+            self.assertNotIn(module, modules)
+
+
+class ProjectTestCase(TestCase):
+    """Tests for `Project` and placement of its data."""
+
+    multi_db = True
+
+    def setUp(self):
+        """Set up a project stored in a DB other than the default one."""
+        self.project = Project.objects.create(title="Large",
+                                              database='other')
+        with use_project(self.project):
+            self.status = IssueStatus.objects.create(title="New",
+                                                     is_solved=False)
+            self.issue = Issue.objects.create(title="Test issue title",
+                                              status=self.status)
+
+    def test_data_stored_in_db_of_project(self):
+        """Test data of the project and side effects are in its DB."""
+        self.assertFalse(Issue.objects.using('default').exists())
+        self.assertEqual(self.issue.project, self.project)
+        self.assertEqual(
+            Issue.objects.using('other').get().status, self.status)
+        self.assertEqual(IssueUpdate.objects.using('other').count(), 1)
+        self.assertEqual(IssueCounter.objects.using('other').get(
+            field_name='status', value=self.status.pk).open_count, 1)
+
+    def test_issue_saved_to_db_it_was_loaded_from(self):
+        """Test an issue saved without current project stays in its DB."""
+        issue = Issue.objects.using('other').get()
+        issue.title = "Changed test issue title"
+        issue.save()
+        self.assertFalse(Issue.objects.using('default').exists())
+        self.assertEqual(IssueUpdate.objects.using('other').count(), 2)
+
+    def test_solved_issue_saved_from_another_project(self):
+        """Test initial state of the issue is read from its DB."""
+        with use_project(self.project):
+            self.issue.status = IssueStatus.objects.create(
+                title="Solved", is_solved=True)
+            self.issue.save()
+            closed = IssueStatus.objects.create(title="Closed",
+                                                is_solved=True)
+        solved_at = self.issue.solved_at
+        project = Project.objects.create(title="Small")
+        with use_project(project):
+            issue = Issue.objects.using('other').defer('status').get()
+            issue.status = closed
+            issue.save()
+        self.assertEqual(Issue.objects.using('other').get().solved_at,
+                         solved_at)
+
+    def test_titles_unique_within_project(self):
+        """Test a status title can be reused only in another project."""
+        IssueStatus.objects.create(title="New", is_solved=False)
+        model_admin = admin.site._registry[IssueStatus]
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser(
+            username='admin0', email='admin0@example.com', password='admin0')
+        form_class = model_admin.get_form(request)
+        with use_project(self.project):
+            form = form_class({'title': "New", 'is_solved': False})
+            self.assertFalse(form.is_valid())
+        self.assertEqual(IssueStatus.objects.using('default').count(), 1)
+
+    def test_admin_shows_issues_of_selected_project(self):
+        """Test the admin lists only issues of the selected project."""
+        Issue.objects.create(title="Default project issue title")
+        User.objects.create_superuser(
+            username='admin0', email='admin0@example.com', password='admin0')
+        self.client.login(username='admin0', password='admin0')
+        self.client.post('/core/project/{}/select/'.format(
+            self.project.pk))
+        self.assertEqual(self.client.session['core_project_id'],
+                         self.project.pk)
+        model_admin = admin.site._registry[Issue]
+        request = RequestFactory().get('/core/issue/')
+        with use_project(self.project):
+            self.assertEqual(list(model_admin.get_queryset(request)),
+                             [self.issue])
+        self.assertEqual(
+            [issue.title for issue in model_admin.get_queryset(request)],
+            ["Default project issue title"])
+
+    def test_history_of_other_project_not_shown(self):
+        """Test history is shown only for issues of the current project."""
+        User.objects.create_superuser(
+            username='admin0', email='admin0@example.com', password='admin0')
+        self.client.login(username='admin0', password='admin0')
+        self.client.post('/core/project/{}/select/'.format(
+            self.project.pk))
+        url = '/core/issue/{}/updates/'.format(self.issue.pk)
+        self.assertContains(self.client.get(url), "Test issue title")
+        other_project = Project.objects.create(title="Other")
+        self.client.post('/core/project/{}/select/'.format(
+            other_project.pk))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_request_queries_counted_in_all_dbs(self):
+        """Test queries to DB of the project are counted in metrics."""
+        def get_queries_sum():
+            for line in self.client.get('/metrics').content.decode(
+                    ).splitlines():
+                if line.startswith(
+                        'issuetracker_request_db_queries_sum'
+                        '{view="admin:core_issuestatus_changelist"}'):
+                    return float(line.split()[-1])
+            return 0
+
+        User.objects.create_superuser(
+            username='admin0', email='admin0@example.com', password='admin0')
+        self.client.login(username='admin0', password='admin0')
+        self.client.post('/core/project/{}/select/'.format(
+            self.project.pk))
+        queries = {'default': 0, 'other': 0}
+
+        def count_query(alias):
+            def wrapper(execute, sql, params, many, context):
+                queries[alias] += 1
+                return execute(sql, params, many, context)
+            return wrapper
+
+        queries_sum = get_queries_sum()
+        with connection.execute_wrapper(count_query('default')), \
+                connections['other'].execute_wrapper(count_query('other')):
+            self.client.get('/core/issuestatus/')
+        self.assertGreater(queries['other'], 0)
+        self.assertEqual(get_queries_sum() - queries_sum,
+                         queries['default'] + queries['other'])
+
+    def test_selected_project_reloaded(self):
+        """Test changes of the selected project apply in the next request.
+
+        A removed project is replaced with the default one.
+        """
+        request = RequestFactory().get('/')
+        SessionMiddleware().process_request(request)
+        request.user = User.objects.create_superuser(
+            username='admin0', email='admin0@example.com', password='admin0')
+        middleware = current_project_storage(
+            lambda request: get_current_project())
+        project = Project.objects.create(title="Small")
+        select_project(request, project)
+        Project.objects.filter(pk=project.pk).update(title="Renamed")
+        self.assertEqual(middleware(request).title, "Renamed")
+        project.delete()
+        self.assertEqual(middleware(request), Project.get_default())
+        self.assertEqual(middleware(request), self.project)
+
+
 @unittest.skip("Implement")
 class IssueAdminTestCase(TestCase):
     """Tests for admin view.
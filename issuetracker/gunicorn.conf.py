@@ -0,0 +1,51 @@
+"""Gunicorn configuration of issuetracker project.
+
+gevent workers are used, so that idle subscribers of the issue updates
+feed (see `core.feed`) cost a greenlet each rather than a worker.
+
+The application is loaded once by the master process, and workers are
+forked with it already imported, so that starting (or recycling) a
+worker doesn't pay for Django setup. As the application modules are
+imported before workers patch the standard library for gevent, it is
+patched here. The number of workers is taken from `WEB_CONCURRENCY`
+environment variable, the number of CPUs by default.
+
+Metrics of workers (see `core.metrics`) are kept in files of
+`prometheus_multiproc_dir`, which is emptied when the master process
+starts (but not when it reloads the configuration on `SIGHUP`, as
+workers that keep running still use the files).
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import multiprocessing  # noqa: E402
+import os  # noqa: E402
+
+bind = ':80'
+worker_class = 'gevent'
+worker_connections = 2000
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+preload_app = True
+
+# Set before the application imports `prometheus_client`.
+os.environ.setdefault('prometheus_multiproc_dir', '/tmp/issuetracker-metrics')
+os.makedirs(os.environ['prometheus_multiproc_dir'], exist_ok=True)
+
+
+def on_starting(server):
+    """Remove metric files left by workers of a previous run."""
+    directory = os.environ['prometheus_multiproc_dir']
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative with gevent in the worker."""
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def child_exit(server, worker):
+    """Drop live-only metrics of an exited worker."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.service_endpoints',
+    'core.middleware.request_metrics',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.current_user_storage',
+    'core.middleware.current_project_storage',
 ]
 
 ROOT_URLCONF = 'issuetracker.urls'
@@ -89,7 +92,9 @@ if len(sys.argv) < 1 or sys.argv[1] != 'test':
             'PASSWORD': 'issuetracker',
             'HOST': 'db',
             'PORT': '5432',
-        }
+        },
+        # Add an alias here (and `migrate --database=<alias>`) to store
+        # data of projects on another DB, see `core.routers`.
     }
 else:
     # Using `TEST` key does not allow to run tests when the main DB is
@@ -103,8 +108,55 @@ else:
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': '/dev/shm/issuetracker.test.db.sqlite3'
             if os.path.isdir('/dev/shm/') else ':memory:',
+        },
+        # DB of projects placed apart from the default one.
+        'other': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': '/dev/shm/issuetracker.test.other.db.sqlite3'
+            if os.path.isdir('/dev/shm/') else ':memory:',
+        },
+    }
+
+# Places data of projects on their DBs.
+DATABASE_ROUTERS = [
+    'core.routers.ProjectRouter',
+]
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.0/topics/cache/
+
+if len(sys.argv) < 1 or sys.argv[1] != 'test':
+    # Shared by all processes of all services, as cached sessions and
+    # permissions must be invalidated in all of them.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': 'memcached:11211',
         }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Sessions
+# https://docs.djangoproject.com/en/2.0/topics/http/sessions/
+
+# Sessions are read from the cache and written through to the DB.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+# Authentication
+# https://docs.djangoproject.com/en/2.0/topics/auth/customizing/
+
+# Caches permissions between requests, see `core.permissions`.
+AUTHENTICATION_BACKENDS = [
+    'core.permissions.CachedPermissionsBackend',
+]
 
 
 # Password validation
@@ -140,6 +192,18 @@ USE_L10N = True
 USE_TZ = True
 
 
+# Issues
+
+# Open issues older than this breach SLA in the issue aging report (see
+# `core.models.IssueAgingReport`). Change of it causes the report to be
+# rebuilt on the next refresh.
+ISSUE_SLA_DAYS = 7
+
+# Directory of the snapshot of issues for solution time analytics (see
+# `core.analytics`), shared by the web and scheduler services.
+ISSUE_ANALYTICS_DIR = '/var/lib/issuetracker/analytics'
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.0/howto/static-files/
 
@@ -0,0 +1,20 @@
+"""Settings of issuetracker project for commands that don't serve HTTP.
+
+Same as `issuetracker.settings`, but without apps, middleware and
+templates needed only by the admin, so that commands run on schedule
+(see `LEAN_COMMANDS` of `manage.py`) start faster. Don't use it for
+`migrate`, as migrations of the excluded apps wouldn't be applied.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS
+
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in ('django.contrib.sessions', 'django.contrib.messages',
+                   'django.contrib.staticfiles', 'admin_view_permission',
+                   'django.contrib.admin')]
+
+MIDDLEWARE = []
+
+TEMPLATES = []
@@ -22,6 +22,7 @@ from django.utils.translation import ugettext_lazy
 admin.site.site_header = ugettext_lazy("Issue Tracker")
 admin.site.index_title = ugettext_lazy("Issues and related entities")
 admin.site.site_url = ''
+admin.site.index_template = 'admin/core/index.html'
 
 
 urlpatterns = [
@@ -2,8 +2,16 @@
 import os
 import sys
 
+# Commands that don't serve HTTP, run with lean settings to start faster.
+LEAN_COMMANDS = {'check_issue_counters', 'refresh_issue_aging',
+                 'refresh_issue_analytics'}
+
 if __name__ == "__main__":
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "issuetracker.settings")
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE",
+        "issuetracker.settings_lean"
+        if len(sys.argv) > 1 and sys.argv[1] in LEAN_COMMANDS
+        else "issuetracker.settings")
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: